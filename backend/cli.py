@@ -0,0 +1,83 @@
+"""Maintenance commands for the Odon Lab CMS backend.
+
+    python cli.py export-static ./public
+    python cli.py export backup.ndjson
+    python cli.py import backup.ndjson
+"""
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+import server
+
+app = typer.Typer(help="Odon Lab CMS maintenance commands")
+
+
+def run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            server.client.close()
+    return asyncio.run(main())
+
+
+@app.command("export-static")
+def export_static(
+    directory: Optional[Path] = typer.Argument(None, help="Output directory; defaults to STATIC_EXPORT_DIR")
+):
+    """Write published pages, projects, settings and referenced media as static files."""
+    directory = directory or (Path(server.STATIC_EXPORT_DIR) if server.STATIC_EXPORT_DIR else None)
+    if directory is None:
+        raise typer.BadParameter("Pass a directory or set STATIC_EXPORT_DIR")
+    directory.mkdir(parents=True, exist_ok=True)
+    written = run(server.export_static_site(directory))
+    typer.echo(f"Static export wrote {written} files to {directory}")
+
+
+@app.command("export")
+def export_backup(
+    path: Path = typer.Argument(..., help="NDJSON file to write"),
+    users: bool = typer.Option(True, help="Include user accounts"),
+    media: bool = typer.Option(True, help="Include media files")
+):
+    """Write pages, projects, settings, users and media to an NDJSON backup."""
+    async def write():
+        with path.open("wb") as handle:
+            async for line in server.export_backup(users, media):
+                handle.write(line)
+    run(write())
+    typer.echo(f"Backup written to {path}")
+
+
+@app.command("import")
+def import_backup(path: Path = typer.Argument(..., exists=True, dir_okay=False, help="NDJSON backup to restore")):
+    """Restore an NDJSON backup, replacing documents with the same keys, then refresh STATIC_EXPORT_DIR."""
+    async def chunks():
+        with path.open("rb") as handle:
+            while chunk := handle.read(server.MEDIA_CHUNK_SIZE):
+                yield chunk
+
+    async def restore():
+        try:
+            return await server.import_backup(chunks())
+        finally:
+            # The debounced export the import scheduled is cancelled when the CLI exits, and a running
+            # server only exports changes it recorded itself, so the static tree is rewritten here
+            if server.STATIC_EXPORT_DIR:
+                directory = Path(server.STATIC_EXPORT_DIR)
+                directory.mkdir(parents=True, exist_ok=True)
+                written = await server.export_static_site(directory)
+                typer.echo(f"Static export wrote {written} files to {directory}")
+    try:
+        counts = run(restore())
+    except ValueError as exc:
+        typer.echo(f"Import failed: {exc}", err=True)
+        raise typer.Exit(1)
+    typer.echo("Imported " + ", ".join(f"{count} {name}" for name, count in counts.items()))
+
+
+if __name__ == "__main__":
+    app()
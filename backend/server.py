@@ -1,35 +1,208 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Query, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse, ORJSONResponse, JSONResponse
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+from pymongo import IndexModel, ASCENDING, DESCENDING, TEXT, ReturnDocument, InsertOne, UpdateOne, DeleteOne, ReplaceOne
+from pymongo.errors import DuplicateKeyError, OperationFailure, BulkWriteError
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Any, Literal, Union, get_args, get_origin
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from dotenv import load_dotenv
 from passlib.context import CryptContext
 from jose import JWTError, jwt
+from starlette.datastructures import Headers, MutableHeaders
+from pymongo import monitoring
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it uploads are served at their original size only
+    Image = None
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it responses are only gzip-compressed
+    brotli = None
 import os
 import logging
 from pathlib import Path
 import uuid
 import base64
+import hashlib
+import json
+import re
+import time
+import asyncio
+import gzip
+import html
+import io
+import zlib
+import orjson
+import copy
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Metrics
+MONGO_SLOW_QUERY_MS = float(os.environ.get('MONGO_SLOW_QUERY_MS', 100))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"]
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", ["method"]
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size", ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total", "MongoDB commands that failed", ["collection", "command"]
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds", "Time spent hashing or verifying passwords, including queueing"
+)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = {}
+
+    def started(self, event):
+        command = event.command
+        collection = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        self.commands[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ""
+
+    def finished(self, event):
+        collection = self.commands.pop((event.connection_id, event.request_id), "")
+        return collection, event.duration_micros / 1_000_000
+
+    def succeeded(self, event):
+        collection, duration = self.finished(event)
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(duration)
+        if duration * 1000 >= MONGO_SLOW_QUERY_MS:
+            logger.warning(f"Slow MongoDB {event.command_name} on '{collection}': {duration * 1000:.1f} ms")
+
+    def failed(self, event):
+        collection, duration = self.finished(event)
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(duration)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics()])
 db = client[os.environ['DB_NAME']]
 
+# Media bytes live in GridFS chunks rather than inside the media documents
+MEDIA_CHUNK_SIZE = int(os.environ.get('MEDIA_CHUNK_SIZE', 255 * 1024))
+media_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="media_files", chunk_size_bytes=MEDIA_CHUNK_SIZE)
+MEDIA_CACHE_CONTROL = os.environ.get('MEDIA_CACHE_CONTROL', 'public, max-age=86400')
+
+# Resized image derivatives, keyed by size name with the longest edge in pixels
+MEDIA_DERIVATIVE_SIZES = {"thumbnail": 200, "medium": 800, "large": 1600}
+MEDIA_DERIVATIVE_FORMATS = {"image/jpeg": "JPEG", "image/png": "PNG", "image/webp": "WEBP"}
+MEDIA_DERIVATIVE_WORKERS = int(os.environ.get('MEDIA_DERIVATIVE_WORKERS', 2))
+media_executor = ThreadPoolExecutor(max_workers=MEDIA_DERIVATIVE_WORKERS, thread_name_prefix="media-derivatives")
+
+# Durable background jobs: workers lease jobs from the jobs collection and retry failures with backoff
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 60))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', 2))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 5))
+JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', 7 * 24 * 3600))
+
+# NDJSON backup and restore; imports are written in batches of this many documents
+BACKUP_FORMAT = "odon-cms-backup"
+BACKUP_FORMAT_VERSION = 1
+BACKUP_IMPORT_BATCH_SIZE = int(os.environ.get('BACKUP_IMPORT_BATCH_SIZE', 500))
+
+# Public content cache
+SITE_CACHE_CONTROL = os.environ.get('SITE_CACHE_CONTROL', 'no-cache')
+CONTENT_CACHE_MAX_ENTRIES = int(os.environ.get('CONTENT_CACHE_MAX_ENTRIES', 256))
+CONTENT_CACHE_TTL_SECONDS = float(os.environ.get('CONTENT_CACHE_TTL_SECONDS', 300))
+
+# Serve read endpoints from trusted DB documents without re-validating them through Pydantic
+FAST_RESPONSES = os.environ.get('FAST_RESPONSES', 'false').lower() in ('1', 'true', 'yes')
+
+# Response compression; bodies of buffered responses are compressed once and reused while unchanged
+COMPRESSION_MINIMUM_SIZE = int(os.environ.get('COMPRESSION_MINIMUM_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+COMPRESSION_CACHE_MAX_ENTRIES = int(os.environ.get('COMPRESSION_CACHE_MAX_ENTRIES', 256))
+COMPRESSION_CACHE_MAX_BODY = int(os.environ.get('COMPRESSION_CACHE_MAX_BODY', 2 * 1024 * 1024))
+# Bodies and streamed chunks at least this large are compressed in a worker thread, off the event loop
+COMPRESSION_THREAD_MIN_SIZE = int(os.environ.get('COMPRESSION_THREAD_MIN_SIZE', 64 * 1024))
+
+# Dashboard counters are maintained incrementally by the mutation routes
+DASHBOARD_COUNTERS_ENABLED = os.environ.get('DASHBOARD_COUNTERS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+DASHBOARD_RECENT_LIMIT = int(os.environ.get('DASHBOARD_RECENT_LIMIT', 5))
+
+# Change feed consumed by the admin UI; entries older than the retention window force a full reload
+CHANGE_LOG_RETENTION_SECONDS = int(os.environ.get('CHANGE_LOG_RETENTION_SECONDS', 7 * 24 * 3600))
+CHANGE_FEED_BATCH_SIZE = int(os.environ.get('CHANGE_FEED_BATCH_SIZE', 500))
+CHANGE_STREAM_HEARTBEAT_SECONDS = float(os.environ.get('CHANGE_STREAM_HEARTBEAT_SECONDS', 15))
+# How long a missing sequence number is awaited before it is treated as lost rather than still being written
+CHANGE_FEED_GAP_GRACE_SECONDS = float(os.environ.get('CHANGE_FEED_GAP_GRACE_SECONDS', 10))
+
+# Full-text search
+SEARCH_SNIPPET_CHARS = int(os.environ.get('SEARCH_SNIPPET_CHARS', 160))
+
+# Static export of published content for nginx or a CDN; admin writes re-export affected files when set
+STATIC_EXPORT_DIR = os.environ.get('STATIC_EXPORT_DIR')
+STATIC_EXPORT_DEBOUNCE_SECONDS = float(os.environ.get('STATIC_EXPORT_DEBOUNCE_SECONDS', 1))
+
+# Set to run explain() on every hot route query at startup and refuse to start on a COLLSCAN
+VERIFY_QUERY_PLANS = os.environ.get('VERIFY_QUERY_PLANS', 'false').lower() in ('1', 'true', 'yes')
+
+# Authenticated principals are cached briefly so admin requests skip the users lookup
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.environ.get('PRINCIPAL_CACHE_MAX_ENTRIES', 1024))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get('PRINCIPAL_CACHE_TTL_SECONDS', 30))
+
 # Security
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here-change-in-production')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes below the configured cost are transparently upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# bcrypt runs in a bounded worker pool so it never blocks the event loop
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_jobs_pending = 0
+
+# Token buckets for /auth/login and /auth/register: capacity and refill rate per second
+AUTH_RATE_LIMIT_BURST = float(os.environ.get('AUTH_RATE_LIMIT_BURST', 10))
+AUTH_RATE_LIMIT_PER_SECOND = float(os.environ.get('AUTH_RATE_LIMIT_PER_SECOND', 0.2))
+# Number of reverse proxies in front of the app that append to X-Forwarded-For. With 0 the peer address
+# is used; behind a proxy that would be the proxy's address, so every client would share one bucket
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
 
 app = FastAPI(title="Odon Lab CMS API", version="1.0.0")
 api_router = APIRouter(prefix="/api")
@@ -42,8 +215,13 @@ class User(BaseModel):
     hashed_password: str
     is_active: bool = True
     is_admin: bool = False
+    token_version: int = 0  # Bumped to revoke every token issued before the change
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class UserAdminUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    is_admin: Optional[bool] = None
+
 class UserCreate(BaseModel):
     username: str
     email: str
@@ -66,6 +244,7 @@ class PageContent(BaseModel):
     meta_description: Optional[str] = None
     meta_keywords: Optional[str] = None
     is_published: bool = True
+    version: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -86,6 +265,13 @@ class PageContentUpdate(BaseModel):
     meta_keywords: Optional[str] = None
     is_published: Optional[bool] = None
 
+class JSONPatchOperation(BaseModel):
+    # RFC 6902 operation; paths are JSON Pointers relative to PageContent.content
+    op: Literal["add", "remove", "replace", "move", "copy", "test"]
+    path: str
+    value: Any = None
+    from_: Optional[str] = Field(None, alias="from")
+
 class Project(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     title: str
@@ -94,6 +280,7 @@ class Project(BaseModel):
     icon: str
     order: int = 0
     is_published: bool = True
+    version: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -124,6 +311,7 @@ class SiteSettings(BaseModel):
     hero_image_url: Optional[str] = None
     theme_colors: Dict[str, str]
     social_links: Dict[str, str]
+    version: int = 0
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class SiteSettingsUpdate(BaseModel):
@@ -137,22 +325,652 @@ class SiteSettingsUpdate(BaseModel):
     theme_colors: Optional[Dict[str, str]] = None
     social_links: Optional[Dict[str, str]] = None
 
+class MediaDerivative(BaseModel):
+    storage_id: str
+    file_type: str
+    file_size: int
+    width: int
+    height: int
+    content_hash: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
 class MediaFile(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     filename: str
     original_filename: str
     file_type: str
     file_size: int
-    file_data: str  # Base64 encoded file data
+    storage_id: str  # GridFS file id holding the file data
+    content_hash: Optional[str] = None  # SHA-256 hex digest of the file data
+    derivatives: Dict[str, MediaDerivative] = Field(default_factory=dict)  # Keyed "<size>" or "<size>.webp"
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
 
+class MediaFilePage(BaseModel):
+    items: List[MediaFile]
+    total: int
+    next_cursor: Optional[str] = None
+
+class BulkOperation(BaseModel):
+    action: Literal["create", "update", "delete"]
+    key: Optional[str] = None  # Project id or page name; required for update and delete
+    data: Dict[str, Any] = Field(default_factory=dict)
+
+class BulkRequest(BaseModel):
+    operations: List[BulkOperation]
+    ordered: bool = True
+
+class BulkItemResult(BaseModel):
+    index: int
+    action: str
+    key: Optional[str] = None
+    status: str = "skipped"  # ok, not_found, error or skipped
+    detail: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+class ProjectReorder(BaseModel):
+    project_ids: List[str]
+
+class SearchResult(BaseModel):
+    kind: str  # "page" or "project"
+    key: str  # Page name or project id
+    title: str
+    snippet: str
+    score: float
+    is_published: bool
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+
+class Job(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    status: Literal["queued", "running", "succeeded", "failed"] = "queued"
+    attempts: int = 0
+    max_attempts: int = JOB_MAX_ATTEMPTS
+    dedupe_key: Optional[str] = None  # At most one unfinished job per key
+    run_at: datetime = Field(default_factory=datetime.utcnow)
+    lease_expires_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    result: Any = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
 # Helper Functions
+def encode_cursor(value: Any, item_id: str):
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    payload = json.dumps({"v": value, "id": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = payload["v"]
+        if isinstance(value, dict) and "$date" in value:
+            value = datetime.fromisoformat(value["$date"])
+        return value, payload["id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_filter(sort_field: str, direction: int, cursor: Optional[str]):
+    # Continue strictly after the (sort value, id) pair the previous page ended on
+    if not cursor:
+        return {}
+    value, item_id = decode_cursor(cursor)
+    op = "$gt" if direction == 1 else "$lt"
+    return {"$or": [
+        {sort_field: {op: value}},
+        {sort_field: value, "id": {op: item_id}}
+    ]}
+
+def scalar_field_types(annotation: Any):
+    # Exact types a stored value must have to serialize as the validated model would; None trusts anything
+    if get_origin(annotation) is Union:
+        groups = [scalar_field_types(arg) for arg in get_args(annotation)]
+        if any(group is None for group in groups):
+            return None
+        return tuple(field_type for group in groups for field_type in group)
+    if annotation is type(None) or annotation in (int, float, str, bool, datetime):
+        return (annotation,)
+    return None
+
+def trusted_field_spec(annotation: Any):
+    # A nested model, alone or as the values of a dict or list, is dumped field by field like its parent
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return ("model", annotation)
+    if get_origin(annotation) in (dict, list):
+        args = get_args(annotation)
+        if args and isinstance(args[-1], type) and issubclass(args[-1], BaseModel):
+            return (get_origin(annotation).__name__, args[-1])
+        return None
+    field_types = scalar_field_types(annotation)
+    return ("scalar", field_types) if field_types is not None else None
+
+trusted_field_specs = {}
+
+def trusted_dump(model_class, document: dict):
+    # Same keys, order and defaults as model_class(**document).dict(), minus validation. Documents
+    # whose scalars would be coerced (a float in an int field, say) take the validating path instead
+    field_specs = trusted_field_specs.get(model_class)
+    if field_specs is None:
+        field_specs = {name: trusted_field_spec(field.annotation) for name, field in model_class.model_fields.items()}
+        trusted_field_specs[model_class] = field_specs
+    dumped = {}
+    for name, field in model_class.model_fields.items():
+        if name not in document:
+            if field.is_required():
+                return model_class(**document).dict()
+            dumped[name] = field.get_default(call_default_factory=True)
+            continue
+        value = document[name]
+        spec = field_specs[name]
+        if spec is None:
+            dumped[name] = value
+            continue
+        kind, field_type = spec
+        if kind == "scalar":
+            if type(value) not in field_type:
+                return model_class(**document).dict()
+        elif kind == "model":
+            if type(value) is not dict:
+                return model_class(**document).dict()
+            value = trusted_dump(field_type, value)
+        elif kind == "dict":
+            if type(value) is not dict or any(type(item) is not dict for item in value.values()):
+                return model_class(**document).dict()
+            value = {key: trusted_dump(field_type, item) for key, item in value.items()}
+        else:
+            if type(value) is not list or any(type(item) is not dict for item in value):
+                return model_class(**document).dict()
+            value = [trusted_dump(field_type, item) for item in value]
+        dumped[name] = value
+    return dumped
+
+def to_model(model_class, document: dict):
+    if FAST_RESPONSES:
+        return trusted_dump(model_class, document)
+    return model_class(**document)
+
+def to_models(model_class, documents: List[dict]):
+    return [to_model(model_class, document) for document in documents]
+
+# orjson writes floats below 1e-4 as 1e-7 or 0.00001 where json.dumps writes 1e-07 and 1e-05
+ORJSON_SMALL_FLOAT = re.compile(rb"e-[1-9](?![0-9])|0\.0000[0-9]")
+
+def json_float_fragments(value: Any):
+    # Embeds the floats orjson would render differently as pre-rendered json.dumps text
+    if type(value) is float:
+        return orjson.Fragment(json.dumps(value)) if 0 < abs(value) < 1e-4 else value
+    if type(value) is dict:
+        return {key: json_float_fragments(item) for key, item in value.items()}
+    if type(value) in (list, tuple):
+        return [json_float_fragments(item) for item in value]
+    return value
+
+class TrustedJSONResponse(ORJSONResponse):
+    # Byte-identical to JSONResponse for the same content. Only bodies that might hold a small float
+    # are walked; a match inside a string costs a second render, not a different result
+    def render(self, content: Any) -> bytes:
+        body = super().render(content)
+        if ORJSON_SMALL_FLOAT.search(body):
+            body = super().render(json_float_fragments(content))
+        return body
+
+def fast_response(content: Any):
+    # TrustedJSONResponse bypasses response_model, so only trusted_dump output may take this path
+    if FAST_RESPONSES:
+        return TrustedJSONResponse(content)
+    return content
+
+def build_projection(model_class, fields: Optional[str], *required: str):
+    if not fields:
+        return {"_id": 0}
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in model_class.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # The id and sort key are always returned so the next cursor can be built
+    projection = {"_id": 0, "id": 1}
+    for field in (*requested, *required):
+        projection[field] = 1
+    return projection
+
+async def find_page(collection, query: dict, sort_field: str, direction: int, limit: Optional[int], cursor: Optional[str], projection: dict):
+    documents_cursor = collection.find({**query, **keyset_filter(sort_field, direction, cursor)}, projection)
+    documents_cursor = documents_cursor.sort([(sort_field, direction), ("id", direction)])
+    if limit:
+        documents_cursor = documents_cursor.limit(limit + 1)
+    documents = await documents_cursor.to_list(None)
+    
+    next_cursor = None
+    if limit and len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1][sort_field], documents[-1]["id"])
+    return documents, next_cursor
+
+def list_response(response: Response, model_class, documents: List[dict], fields: Optional[str], next_cursor: Optional[str]):
+    if fields:
+        # Partial documents cannot satisfy response_model, so they are returned as-is
+        result = TrustedJSONResponse(documents) if FAST_RESPONSES else JSONResponse(jsonable_encoder(documents))
+    else:
+        result = fast_response(to_models(model_class, documents))
+    if next_cursor:
+        target = result if isinstance(result, Response) else response
+        target.headers["X-Next-Cursor"] = next_cursor
+    return result
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]):
+    if if_none_match is None or etag is None:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def accepts_encoding(request: Request, encoding: str):
+    return encoding_accepted(request.headers.get("accept-encoding", ""), encoding)
+
+def encoding_accepted(accept_encoding: str, encoding: str):
+    # An explicit entry for the coding overrides "*", wherever the two appear in the header
+    qualities = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if name not in (encoding, "*") or name in qualities:
+            continue
+        params = params.strip()
+        try:
+            qualities[name] = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            qualities[name] = 0.0
+    quality = qualities.get(encoding, qualities.get("*", 0.0))
+    return quality > 0
+
+def parse_if_match(if_match: Optional[str]):
+    if if_match is None:
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must carry the document version")
+
+def version_filter(expected_version: Optional[int]):
+    if expected_version is None:
+        return {}
+    if expected_version == 0:
+        # Documents written before versioning have no version field
+        return {"version": {"$in": [0, None]}}
+    return {"version": expected_version}
+
+def versioned_update(update_data: dict):
+    return {"$set": update_data, "$inc": {"version": 1}}
+
+def toggle_published_pipeline():
+    # Evaluated server-side so concurrent toggles cannot lose each other's writes
+    return [{"$set": {
+        "is_published": {"$not": ["$is_published"]},
+        "updated_at": datetime.utcnow(),
+        "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+    }}]
+
+async def find_one_and_update_versioned(
+    collection, query: dict, update: Any, if_match: Optional[str], not_found_detail: str,
+    return_document: ReturnDocument = ReturnDocument.AFTER
+):
+    expected_version = parse_if_match(if_match)
+    document = await collection.find_one_and_update(
+        {**query, **version_filter(expected_version)},
+        update,
+        projection={"_id": 0},
+        return_document=return_document
+    )
+    if document is not None:
+        return document
+    if expected_version is not None and await collection.count_documents(query, limit=1):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Document was modified by another request"
+        )
+    raise HTTPException(status_code=404, detail=not_found_detail)
+
+def set_version_etag(response: Response, document: dict):
+    response.headers["ETag"] = f'"{document.get("version", 0)}"'
+
+def parse_json_pointer(pointer: str):
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise HTTPException(status_code=400, detail=f"Invalid JSON pointer '{pointer}'")
+    segments = [segment.replace("~1", "/").replace("~0", "~") for segment in pointer[1:].split("/")]
+    for segment in segments:
+        if not segment or "." in segment or segment.startswith("$"):
+            raise HTTPException(status_code=400, detail=f"Path '{pointer}' cannot be stored as a field name")
+    return segments
+
+def is_array_index(segment: str):
+    return segment.isdigit() and (segment == "0" or not segment.startswith("0"))
+
+def paths_overlap(first: List[str], second: List[str]):
+    shortest = min(len(first), len(second))
+    return first[:shortest] == second[:shortest]
+
+class ContentPatch:
+    # Applies JSON Patch operations to a copy of the stored content while recording the equivalent
+    # targeted update plus filter guards that fail if the touched paths changed underneath us
+    def __init__(self, content: dict):
+        self.original = content
+        self.content = copy.deepcopy(content)
+        self.set = {}
+        self.unset = {}
+        self.push = {}
+        self.guards = {}
+        self.touched = []
+
+    @staticmethod
+    def field(segments: List[str]):
+        return ".".join(["content", *segments])
+
+    def resolve(self, segments: List[str], pointer: str):
+        target = self.content
+        for segment in segments:
+            if isinstance(target, dict) and segment in target:
+                target = target[segment]
+            elif isinstance(target, list) and is_array_index(segment) and int(segment) < len(target):
+                target = target[int(segment)]
+            else:
+                raise HTTPException(status_code=400, detail=f"Path '{pointer}' does not exist")
+        return target
+
+    def apply(self, operation: JSONPatchOperation):
+        if operation.op in ("add", "replace", "test") and "value" not in operation.model_fields_set:
+            raise HTTPException(status_code=400, detail=f"'{operation.op}' operation requires a value")
+        segments = parse_json_pointer(operation.path)
+        if operation.op == "add":
+            self.add(segments, operation.value, operation.path)
+        elif operation.op == "remove":
+            self.remove(segments, operation.path)
+        elif operation.op == "replace":
+            self.resolve(segments, operation.path)
+            self.replace(segments, operation.value)
+        elif operation.op == "test":
+            current = self.resolve(segments, operation.path)
+            if current != operation.value:
+                raise HTTPException(status_code=409, detail=f"Test failed at '{operation.path}'")
+            self.guards[self.field(segments)] = current
+            self.touched.append(segments)
+        else:
+            if operation.from_ is None:
+                raise HTTPException(status_code=400, detail=f"'{operation.op}' operation requires 'from'")
+            source = parse_json_pointer(operation.from_)
+            value = copy.deepcopy(self.resolve(source, operation.from_))
+            if operation.op == "move":
+                if len(source) < len(segments) and segments[:len(source)] == source:
+                    raise HTTPException(status_code=400, detail="Cannot move a value into one of its children")
+                self.remove(source, operation.from_)
+            else:
+                self.guards[self.field(source)] = value
+                self.touched.append(source)
+            self.add(segments, copy.deepcopy(value), operation.path)
+
+    def pin_array_elements(self, segments: List[str]):
+        # A concurrent insert or removal shifts every later position, so each array element the path
+        # passes through must still hold what we read. Paths missing from the original were created by an
+        # earlier operation in this patch, which overlaps and is rewritten from the top-level key instead
+        target = self.original
+        for depth, segment in enumerate(segments):
+            if isinstance(target, list) and is_array_index(segment) and int(segment) < len(target):
+                target = target[int(segment)]
+                self.guards[self.field(segments[:depth + 1])] = copy.deepcopy(target)
+            elif isinstance(target, dict) and segment in target:
+                target = target[segment]
+            else:
+                return
+
+    def replace(self, segments: List[str], value: Any):
+        if not segments:
+            if not isinstance(value, dict):
+                raise HTTPException(status_code=400, detail="Page content must be an object")
+            self.content = value
+        else:
+            parent = self.resolve(segments[:-1], "")
+            key = segments[-1]
+            self.pin_array_elements(segments[:-1])
+            if isinstance(parent, list):
+                # A concurrent insert would shift positions, so the element must still hold what we read
+                self.guards[self.field(segments)] = copy.deepcopy(parent[int(key)])
+                parent[int(key)] = value
+            else:
+                self.guards[self.field(segments)] = {"$exists": True}
+                parent[key] = value
+        self.set[self.field(segments)] = value
+        self.touched.append(segments)
+
+    def add(self, segments: List[str], value: Any, pointer: str):
+        if not segments:
+            self.replace(segments, value)
+            return
+        parent_segments, key = segments[:-1], segments[-1]
+        parent = self.resolve(parent_segments, pointer)
+        self.pin_array_elements(parent_segments)
+        if isinstance(parent, dict):
+            parent[key] = value
+            self.set[self.field(segments)] = value
+            if parent_segments:
+                self.guards.setdefault(self.field(parent_segments), {"$type": "object"})
+            self.touched.append(segments)
+        elif isinstance(parent, list):
+            index = len(parent) if key == "-" else int(key) if is_array_index(key) else -1
+            if not 0 <= index <= len(parent):
+                raise HTTPException(status_code=400, detail=f"Path '{pointer}' is not a valid array position")
+            parent.insert(index, value)
+            array_field = self.field(parent_segments)
+            self.push[array_field] = {"$each": [value]} if key == "-" else {"$each": [value], "$position": index}
+            self.guards.setdefault(array_field, {"$type": "array"})
+            if key != "-" and index:
+                self.guards[f"{array_field}.{index - 1}"] = {"$exists": True}
+            self.touched.append(parent_segments)
+        else:
+            raise HTTPException(status_code=400, detail=f"Path '{pointer}' does not point into an object or array")
+
+    def remove(self, segments: List[str], pointer: str):
+        if not segments:
+            raise HTTPException(status_code=400, detail="Page content itself cannot be removed")
+        self.resolve(segments, pointer)
+        parent_segments, key = segments[:-1], segments[-1]
+        parent = self.resolve(parent_segments, pointer)
+        self.pin_array_elements(parent_segments)
+        if isinstance(parent, dict):
+            del parent[key]
+            self.unset[self.field(segments)] = ""
+            self.guards[self.field(segments)] = {"$exists": True}
+            self.touched.append(segments)
+        else:
+            # MongoDB cannot pull by position, so the array is rewritten guarded by its stored value
+            array_field = self.field(parent_segments)
+            self.guards[array_field] = copy.deepcopy(parent)
+            del parent[int(key)]
+            self.set[array_field] = parent
+            self.touched.append(parent_segments)
+
+    def compile(self):
+        # Operations touching overlapping paths cannot share one update document, so the affected
+        # top-level keys are rewritten from the patched copy instead, guarded by their stored values
+        overlapping = any(
+            paths_overlap(first, second)
+            for index, first in enumerate(self.touched)
+            for second in self.touched[index + 1:]
+        )
+        if overlapping:
+            if any(not segments for segments in self.touched):
+                return {"$set": {"content": self.content}}, {"content": self.original}
+            update, guards = {"$set": {}, "$unset": {}}, {}
+            for key in {segments[0] for segments in self.touched}:
+                field = self.field([key])
+                guards[field] = self.original[key] if key in self.original else {"$exists": False}
+                if key in self.content:
+                    update["$set"][field] = self.content[key]
+                else:
+                    update["$unset"][field] = ""
+            return {operator: fields for operator, fields in update.items() if fields}, guards
+        update = {"$set": self.set, "$unset": self.unset, "$push": self.push}
+        return {operator: fields for operator, fields in update.items() if fields}, self.guards
+
+async def execute_bulk(collection, key_field: str, bulk: BulkRequest, create_model, update_model, document_model, protected_keys=()):
+    results = [BulkItemResult(index=index, action=op.action, key=op.key) for index, op in enumerate(bulk.operations)]
+    
+    # One lookup tells us which update/delete targets exist so each item gets its own result
+    keys = [op.key for op in bulk.operations if op.action != "create" and op.key]
+    existing_keys = set()
+    if keys:
+        async for document in collection.find({key_field: {"$in": keys}}, {key_field: 1}):
+            existing_keys.add(document[key_field])
+    
+    requests, request_indexes = [], []
+    now = datetime.utcnow()
+    for index, op in enumerate(bulk.operations):
+        result = results[index]
+        try:
+            if op.action == "create":
+                document = document_model(**create_model(**op.data).dict())
+                result.key = getattr(document, key_field)
+                requests.append(InsertOne(document.dict()))
+            elif not op.key:
+                raise ValueError(f"key is required for {op.action}")
+            elif op.action == "delete" and op.key in protected_keys:
+                raise ValueError(f"Cannot delete {op.key}")
+            elif op.key not in existing_keys:
+                result.status = "not_found"
+                continue
+            elif op.action == "update":
+                update_data = update_model(**op.data).dict(exclude_unset=True)
+                update_data["updated_at"] = now
+                requests.append(UpdateOne({key_field: op.key}, versioned_update(update_data)))
+            else:
+                requests.append(DeleteOne({key_field: op.key}))
+        except ValueError as e:
+            result.status = "error"
+            result.detail = str(e)
+            if bulk.ordered:
+                break
+            continue
+        result.status = "ok"
+        request_indexes.append(index)
+    
+    if requests:
+        try:
+            await collection.bulk_write(requests, ordered=bulk.ordered)
+        except BulkWriteError as e:
+            write_errors = {error["index"]: error["errmsg"] for error in e.details.get("writeErrors", [])}
+            first_error = min(write_errors, default=len(requests))
+            for position, index in enumerate(request_indexes):
+                if position in write_errors:
+                    results[index].status = "error"
+                    results[index].detail = write_errors[position]
+                elif bulk.ordered and position > first_error:
+                    results[index].status = "skipped"
+    
+    succeeded = sum(1 for result in results if result.status == "ok")
+    return BulkResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def run_password_job(func, *args):
+    global password_jobs_pending
+    if password_jobs_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+    password_jobs_pending += 1
+    try:
+        with PASSWORD_HASH_DURATION.time():
+            return await asyncio.get_running_loop().run_in_executor(password_executor, func, *args)
+    finally:
+        password_jobs_pending -= 1
+
+async def hash_password(password: str):
+    return await run_password_job(get_password_hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str):
+    # Returns (is_valid, new_hash); new_hash is set when the stored hash uses outdated settings
+    return await run_password_job(pwd_context.verify_and_update, plain_password, hashed_password)
+
+class TokenBucketLimiter:
+    def __init__(self, capacity: float, refill_per_second: float, max_keys: int = 10000):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+
+    def available(self, key: str, now: float):
+        tokens, updated_at = self.buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+
+    def retry_after(self, key: str):
+        # Seconds until a token is available, without taking one
+        tokens = self.available(key, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.refill_per_second
+
+    def try_acquire(self, key: str):
+        # Returns 0 when a token was taken, otherwise the seconds until one is available
+        now = time.monotonic()
+        tokens = self.available(key, now)
+        self.buckets.pop(key, None)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self.refill_per_second
+        self.buckets[key] = (tokens, now)
+        while len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return retry_after
+
+auth_rate_limiter = TokenBucketLimiter(AUTH_RATE_LIMIT_BURST, AUTH_RATE_LIMIT_PER_SECOND)
+
+def client_address(request: Request):
+    peer = request.client.host if request.client else "unknown"
+    if not TRUSTED_PROXY_HOPS:
+        return peer
+    # Each trusted proxy appends the address it received the request from, so the client is the entry
+    # TRUSTED_PROXY_HOPS from the right; anything further left was supplied by the client itself
+    forwarded = [address.strip() for address in request.headers.get("x-forwarded-for", "").split(",") if address.strip()]
+    if len(forwarded) < TRUSTED_PROXY_HOPS:
+        return forwarded[0] if forwarded else peer
+    return forwarded[-TRUSTED_PROXY_HOPS]
+
+def raise_rate_limited(retry_after: float):
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts, please try again later",
+        headers={"Retry-After": str(int(retry_after) + 1)}
+    )
+
+def enforce_auth_rate_limit(request: Request, username: str):
+    # Every attempt costs a token from the client's bucket. The username bucket is only checked here and
+    # charged by record_auth_failure, so only failed attempts count against an account
+    retry_after = auth_rate_limiter.try_acquire(f"{request.url.path}:ip:{client_address(request)}")
+    if not retry_after:
+        retry_after = auth_rate_limiter.retry_after(f"{request.url.path}:user:{username.lower()}")
+    if retry_after:
+        raise_rate_limited(retry_after)
+
+def record_auth_failure(request: Request, username: str):
+    auth_rate_limiter.try_acquire(f"{request.url.path}:user:{username.lower()}")
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -177,10 +995,21 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
     
-    user = await db.users.find_one({"username": username})
-    if user is None:
+    token_version = payload.get("ver", 0)
+    cache_key = f"{username}:{token_version}"
+    found, user = principal_cache.get(cache_key)
+    if found:
+        return user
+    
+    generation = principal_cache.generation
+    db_user = await db.users.find_one({"username": username})
+    if db_user is None:
+        raise credentials_exception
+    user = User(**db_user)
+    if not user.is_active or user.token_version != token_version:
         raise credentials_exception
-    return User(**user)
+    principal_cache.set(cache_key, user, generation)
+    return user
 
 async def get_current_admin_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_admin:
@@ -190,6 +1019,118 @@ async def get_current_admin_user(current_user: User = Depends(get_current_user))
         )
     return current_user
 
+# Content Cache
+class TTLCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        # Bumped on every invalidation so loads that raced a write are not stored
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def set(self, key: str, value: Any, generation: int):
+        if generation != self.generation:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *keys: str):
+        self.generation += 1
+        for key in keys:
+            if self.entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        self.generation += 1
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+content_cache = TTLCache(CONTENT_CACHE_MAX_ENTRIES, CONTENT_CACHE_TTL_SECONDS)
+principal_cache = TTLCache(PRINCIPAL_CACHE_MAX_ENTRIES, PRINCIPAL_CACHE_TTL_SECONDS)
+
+# In-flight loads by key, so concurrent misses share one load instead of each rebuilding the value
+content_loads = {}
+
+async def read_through(key: str, loader):
+    found, value = content_cache.get(key)
+    if found:
+        return value
+    generation = content_cache.generation
+    pending = content_loads.get(key)
+    # A load that started before the last invalidation may return stale data, so it is not joined
+    if pending is None or pending[0] != generation:
+        async def load():
+            value = await loader()
+            content_cache.set(key, value, generation)
+            return value
+        
+        future = asyncio.ensure_future(load())
+        content_loads[key] = (generation, future)
+        
+        def forget(_):
+            if content_loads.get(key, (None, None))[1] is future:
+                del content_loads[key]
+        future.add_done_callback(forget)
+        pending = (generation, future)
+    # Shielded so one cancelled request does not cancel the load the others are waiting on
+    return await asyncio.shield(pending[1])
+
+def invalidate_page_cache(page_name: str):
+    content_cache.invalidate("pages:published", f"page:{page_name}", "site:snapshot")
+
+def invalidate_project_cache():
+    content_cache.invalidate("projects:published", "site:snapshot")
+
+def invalidate_settings_cache():
+    content_cache.invalidate("settings", "site:snapshot")
+
+async def revoke_user_tokens(username: str, changes: Optional[dict] = None):
+    update = {"$inc": {"token_version": 1}}
+    if changes:
+        update["$set"] = changes
+    previous = await db.users.find_one_and_update({"username": username}, update)
+    if previous is None:
+        return None
+    principal_cache.invalidate(f"{username}:{previous.get('token_version', 0)}")
+    return await db.users.find_one({"username": username})
+
 # Initialize default admin user
 async def init_default_admin():
     admin_exists = await db.users.find_one({"username": "admin"})
@@ -197,7 +1138,7 @@ async def init_default_admin():
         admin_user = User(
             username="admin",
             email="admin@odonlab.com",
-            hashed_password=get_password_hash("admin123"),
+            hashed_password=await hash_password("admin123"),
             is_admin=True
         )
         await db.users.insert_one(admin_user.dict())
@@ -205,36 +1146,53 @@ async def init_default_admin():
 
 # Authentication Routes
 @api_router.post("/auth/register", response_model=User)
-async def register(user: UserCreate):
+async def register(user: UserCreate, request: Request):
+    enforce_auth_rate_limit(request, user.username)
     existing_user = await db.users.find_one({"username": user.username})
     if existing_user:
+        record_auth_failure(request, user.username)
         raise HTTPException(
             status_code=400,
             detail="Username already registered"
         )
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     new_user = User(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password
     )
-    await db.users.insert_one(new_user.dict())
+    try:
+        await db.users.insert_one(new_user.dict())
+    except DuplicateKeyError:
+        record_auth_failure(request, user.username)
+        raise HTTPException(
+            status_code=400,
+            detail="Username already registered"
+        )
     return new_user
 
 @api_router.post("/auth/login", response_model=Token)
-async def login(user: UserLogin):
+async def login(user: UserLogin, request: Request):
+    enforce_auth_rate_limit(request, user.username)
     db_user = await db.users.find_one({"username": user.username})
-    if not db_user or not verify_password(user.password, db_user["hashed_password"]):
+    is_valid, new_hash = False, None
+    if db_user:
+        is_valid, new_hash = await verify_and_update_password(user.password, db_user["hashed_password"])
+    if not is_valid or not db_user.get("is_active", True):
+        record_auth_failure(request, user.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        await db.users.update_one({"id": db_user["id"]}, {"$set": {"hashed_password": new_hash}})
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": db_user["username"]}, expires_delta=access_token_expires
+        data={"sub": db_user["username"], "ver": db_user.get("token_version", 0)},
+        expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -242,23 +1200,109 @@ async def login(user: UserLogin):
 async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
+@api_router.post("/auth/revoke")
+async def revoke_my_tokens(current_user: User = Depends(get_current_user)):
+    await revoke_user_tokens(current_user.username)
+    return {"message": "All tokens revoked successfully"}
+
+# User Management Routes
+@api_router.patch("/users/{username}", response_model=User)
+async def update_user(username: str, user_update: UserAdminUpdate, current_user: User = Depends(get_current_admin_user)):
+    update_data = user_update.dict(exclude_unset=True)
+    if username == current_user.username and (
+        update_data.get("is_active") is False or update_data.get("is_admin") is False
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot deactivate or demote your own account"
+        )
+    
+    # Any change in status revokes outstanding tokens so cached principals are dropped
+    updated_user = await revoke_user_tokens(username, update_data)
+    if updated_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return User(**updated_user)
+
+# Content Change Hooks
+async def page_changed(page_name: str, page: Optional[dict], record: bool = True):
+    # page is the document after the write, or None when it was deleted
+    invalidate_page_cache(page_name)
+    await update_search_document("page", page_name, page)
+    if record:
+        await record_changes("page", [page_name], deleted=page is None)
+
+async def project_changed(project_id: str, project: Optional[dict], record: bool = True):
+    invalidate_project_cache()
+    await update_search_document("project", project_id, project)
+    if record:
+        await record_changes("project", [project_id], deleted=project is None)
+
+async def pages_changed(page_names: List[str]):
+    if not page_names:
+        return
+    pages = {page["page_name"]: page async for page in db.pages.find({"page_name": {"$in": page_names}}, {"_id": 0})}
+    for page_name in page_names:
+        await page_changed(page_name, pages.get(page_name), record=False)
+    await record_changes("page", [name for name in page_names if name in pages])
+    await record_changes("page", [name for name in page_names if name not in pages], deleted=True)
+
+async def projects_changed(project_ids: List[str]):
+    if not project_ids:
+        return
+    projects = {project["id"]: project async for project in db.projects.find({"id": {"$in": project_ids}}, {"_id": 0})}
+    for project_id in project_ids:
+        await project_changed(project_id, projects.get(project_id), record=False)
+    await record_changes("project", [project_id for project_id in project_ids if project_id in projects])
+    await record_changes("project", [project_id for project_id in project_ids if project_id not in projects], deleted=True)
+
+def succeeded_keys(response: BulkResponse):
+    return [result.key for result in response.results if result.status == "ok"]
+
 # Page Content Routes
+async def load_published_pages():
+    pages = await db.pages.find({"is_published": True}, {"_id": 0}).to_list(None)
+    return to_models(PageContent, pages)
+
 @api_router.get("/pages", response_model=List[PageContent])
-async def get_pages():
-    pages = await db.pages.find().to_list(1000)
-    return [PageContent(**page) for page in pages]
+async def get_pages(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+    is_published: Optional[bool] = None
+):
+    query = {}
+    if updated_since:
+        query["updated_at"] = {"$gte": updated_since}
+    if is_published is not None:
+        query["is_published"] = is_published
+    
+    pages, next_cursor = await find_page(
+        db.pages, query, "updated_at", -1, limit, cursor, build_projection(PageContent, fields, "updated_at")
+    )
+    return list_response(response, PageContent, pages, fields, next_cursor)
 
 @api_router.get("/pages/published", response_model=List[PageContent])
-async def get_published_pages():
-    pages = await db.pages.find({"is_published": True}).to_list(1000)
-    return [PageContent(**page) for page in pages]
+async def get_published_pages(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    updated_since: Optional[datetime] = None
+):
+    if not (limit or cursor or fields or updated_since):
+        return fast_response(await read_through("pages:published", load_published_pages))
+    return await get_pages(response, limit, cursor, fields, updated_since, is_published=True)
 
 @api_router.get("/pages/{page_name}", response_model=PageContent)
 async def get_page(page_name: str):
-    page = await db.pages.find_one({"page_name": page_name})
-    if not page:
-        raise HTTPException(status_code=404, detail="Page not found")
-    return PageContent(**page)
+    async def load():
+        page = await db.pages.find_one({"page_name": page_name}, {"_id": 0})
+        if not page:
+            raise HTTPException(status_code=404, detail="Page not found")
+        return to_model(PageContent, page)
+    return fast_response(await read_through(f"page:{page_name}", load))
 
 @api_router.post("/pages", response_model=PageContent)
 async def create_page(page: PageContentCreate, current_user: User = Depends(get_current_admin_user)):
@@ -272,20 +1316,49 @@ async def create_page(page: PageContentCreate, current_user: User = Depends(get_
     
     page_dict = page.dict()
     page_obj = PageContent(**page_dict)
-    await db.pages.insert_one(page_obj.dict())
+    try:
+        await db.pages.insert_one(page_obj.dict())
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=400,
+            detail="Page with this name already exists"
+        )
+    await adjust_dashboard_counters(total_pages=1, published_pages=int(page_obj.is_published))
+    await page_changed(page_obj.page_name, page_obj.dict())
     return page_obj
 
+@api_router.post("/pages/bulk", response_model=BulkResponse)
+async def bulk_pages(bulk: BulkRequest, current_user: User = Depends(get_current_admin_user)):
+    response = await execute_bulk(
+        db.pages, "page_name", bulk, PageContentCreate, PageContentUpdate, PageContent, protected_keys=("home",)
+    )
+    await pages_changed(succeeded_keys(response))
+    if response.succeeded:
+        await reset_dashboard_counters()
+    return response
+
 @api_router.put("/pages/{page_name}", response_model=PageContent)
-async def update_page(page_name: str, page_update: PageContentUpdate, current_user: User = Depends(get_current_admin_user)):
-    page = await db.pages.find_one({"page_name": page_name})
-    if not page:
-        raise HTTPException(status_code=404, detail="Page not found")
-    
+async def update_page(
+    page_name: str,
+    page_update: PageContentUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_admin_user)
+):
     update_data = page_update.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     
-    await db.pages.update_one({"page_name": page_name}, {"$set": update_data})
-    updated_page = await db.pages.find_one({"page_name": page_name})
+    # The previous document tells us whether the publish state flipped; the update is $set-only
+    previous_page = await find_one_and_update_versioned(
+        db.pages, {"page_name": page_name}, versioned_update(update_data), if_match, "Page not found",
+        return_document=ReturnDocument.BEFORE
+    )
+    updated_page = {**previous_page, **update_data, "version": previous_page.get("version", 0) + 1}
+    await adjust_dashboard_counters(
+        published_pages=int(bool(updated_page.get("is_published", True))) - int(bool(previous_page.get("is_published", True)))
+    )
+    await page_changed(page_name, updated_page)
+    set_version_etag(response, updated_page)
     return PageContent(**updated_page)
 
 @api_router.delete("/pages/{page_name}")
@@ -297,89 +1370,203 @@ async def delete_page(page_name: str, current_user: User = Depends(get_current_a
             detail="Cannot delete home page"
         )
     
-    result = await db.pages.delete_one({"page_name": page_name})
-    if result.deleted_count == 0:
+    deleted_page = await db.pages.find_one_and_delete({"page_name": page_name}, {"is_published": 1})
+    if not deleted_page:
         raise HTTPException(status_code=404, detail="Page not found")
+    await adjust_dashboard_counters(total_pages=-1, published_pages=-int(deleted_page["is_published"]))
+    await page_changed(page_name, None)
     return {"message": "Page deleted successfully"}
 
 @api_router.patch("/pages/{page_name}/toggle-status")
-async def toggle_page_status(page_name: str, current_user: User = Depends(get_current_admin_user)):
-    page = await db.pages.find_one({"page_name": page_name})
+async def toggle_page_status(
+    page_name: str,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_admin_user)
+):
+    updated_page = await find_one_and_update_versioned(
+        db.pages, {"page_name": page_name}, toggle_published_pipeline(), if_match, "Page not found"
+    )
+    await adjust_dashboard_counters(published_pages=1 if updated_page["is_published"] else -1)
+    await page_changed(page_name, updated_page)
+    set_version_etag(response, updated_page)
+    return PageContent(**updated_page)
+
+@api_router.patch("/pages/{page_name}/content", response_model=PageContent)
+async def patch_page_content(
+    page_name: str,
+    operations: List[JSONPatchOperation],
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_admin_user)
+):
+    expected_version = parse_if_match(if_match)
+    page = await db.pages.find_one({"page_name": page_name}, {"_id": 0, "content": 1, "version": 1})
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
+    if expected_version is not None and page.get("version", 0) != expected_version:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Document was modified by another request"
+        )
     
-    new_status = not page["is_published"]
-    await db.pages.update_one(
-        {"page_name": page_name}, 
-        {"$set": {"is_published": new_status, "updated_at": datetime.utcnow()}}
-    )
+    patch = ContentPatch(page.get("content") or {})
+    for operation in operations:
+        patch.apply(operation)
+    update, guards = patch.compile()
+    update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+    update["$inc"] = {"version": 1}
     
-    updated_page = await db.pages.find_one({"page_name": page_name})
+    # Guards only cover the paths this patch touches, so concurrent edits elsewhere in the page still apply
+    updated_page = await db.pages.find_one_and_update(
+        {"page_name": page_name, **version_filter(expected_version), **guards},
+        update,
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if updated_page is None:
+        current = await db.pages.find_one({"page_name": page_name}, {"version": 1})
+        if current is None:
+            raise HTTPException(status_code=404, detail="Page not found")
+        if expected_version is not None and current.get("version", 0) != expected_version:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Document was modified by another request"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The patched content was changed by another request; reload and retry"
+        )
+    await page_changed(page_name, updated_page)
+    set_version_etag(response, updated_page)
     return PageContent(**updated_page)
 
 # Project Routes
+async def load_published_projects():
+    projects = await db.projects.find({"is_published": True}, {"_id": 0}).sort([("order", 1), ("id", 1)]).to_list(None)
+    return to_models(Project, projects)
+
 @api_router.get("/projects", response_model=List[Project])
-async def get_projects():
-    projects = await db.projects.find().sort("order", 1).to_list(1000)
-    return [Project(**project) for project in projects]
+async def get_projects(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+    is_published: Optional[bool] = None
+):
+    query = {}
+    if updated_since:
+        query["updated_at"] = {"$gte": updated_since}
+    if is_published is not None:
+        query["is_published"] = is_published
+    
+    projects, next_cursor = await find_page(
+        db.projects, query, "order", 1, limit, cursor, build_projection(Project, fields, "order")
+    )
+    return list_response(response, Project, projects, fields, next_cursor)
 
 @api_router.get("/projects/published", response_model=List[Project])
-async def get_published_projects():
-    projects = await db.projects.find({"is_published": True}).sort("order", 1).to_list(1000)
-    return [Project(**project) for project in projects]
+async def get_published_projects(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    updated_since: Optional[datetime] = None
+):
+    if not (limit or cursor or fields or updated_since):
+        return fast_response(await read_through("projects:published", load_published_projects))
+    return await get_projects(response, limit, cursor, fields, updated_since, is_published=True)
 
 @api_router.get("/projects/{project_id}", response_model=Project)
 async def get_project(project_id: str):
-    project = await db.projects.find_one({"id": project_id})
+    project = await db.projects.find_one({"id": project_id}, {"_id": 0})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    return Project(**project)
+    return fast_response(to_model(Project, project))
 
 @api_router.post("/projects", response_model=Project)
 async def create_project(project: ProjectCreate, current_user: User = Depends(get_current_admin_user)):
     project_dict = project.dict()
     project_obj = Project(**project_dict)
     await db.projects.insert_one(project_obj.dict())
+    await adjust_dashboard_counters(total_projects=1, published_projects=int(project_obj.is_published))
+    await project_changed(project_obj.id, project_obj.dict())
     return project_obj
 
+@api_router.post("/projects/bulk", response_model=BulkResponse)
+async def bulk_projects(bulk: BulkRequest, current_user: User = Depends(get_current_admin_user)):
+    response = await execute_bulk(db.projects, "id", bulk, ProjectCreate, ProjectUpdate, Project)
+    await projects_changed(succeeded_keys(response))
+    if response.succeeded:
+        await reset_dashboard_counters()
+    return response
+
+@api_router.post("/projects/reorder", response_model=BulkResponse)
+async def reorder_projects(reorder: ProjectReorder, current_user: User = Depends(get_current_admin_user)):
+    bulk = BulkRequest(
+        operations=[
+            BulkOperation(action="update", key=project_id, data={"order": position})
+            for position, project_id in enumerate(reorder.project_ids, start=1)
+        ],
+        ordered=False
+    )
+    response = await execute_bulk(db.projects, "id", bulk, ProjectCreate, ProjectUpdate, Project)
+    if response.succeeded:
+        # Order changes do not touch the search index, so only the cache and change feed are updated
+        invalidate_project_cache()
+        await record_changes("project", succeeded_keys(response))
+    return response
+
 @api_router.put("/projects/{project_id}", response_model=Project)
-async def update_project(project_id: str, project_update: ProjectUpdate, current_user: User = Depends(get_current_admin_user)):
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
+async def update_project(
+    project_id: str,
+    project_update: ProjectUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_admin_user)
+):
     update_data = project_update.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     
-    await db.projects.update_one({"id": project_id}, {"$set": update_data})
-    updated_project = await db.projects.find_one({"id": project_id})
+    previous_project = await find_one_and_update_versioned(
+        db.projects, {"id": project_id}, versioned_update(update_data), if_match, "Project not found",
+        return_document=ReturnDocument.BEFORE
+    )
+    updated_project = {**previous_project, **update_data, "version": previous_project.get("version", 0) + 1}
+    await adjust_dashboard_counters(
+        published_projects=int(bool(updated_project.get("is_published", True))) - int(bool(previous_project.get("is_published", True)))
+    )
+    await project_changed(project_id, updated_project)
+    set_version_etag(response, updated_project)
     return Project(**updated_project)
 
 @api_router.delete("/projects/{project_id}")
 async def delete_project(project_id: str, current_user: User = Depends(get_current_admin_user)):
-    result = await db.projects.delete_one({"id": project_id})
-    if result.deleted_count == 0:
+    deleted_project = await db.projects.find_one_and_delete({"id": project_id}, {"is_published": 1})
+    if not deleted_project:
         raise HTTPException(status_code=404, detail="Project not found")
+    await adjust_dashboard_counters(total_projects=-1, published_projects=-int(deleted_project["is_published"]))
+    await project_changed(project_id, None)
     return {"message": "Project deleted successfully"}
 
 @api_router.patch("/projects/{project_id}/toggle-status")
-async def toggle_project_status(project_id: str, current_user: User = Depends(get_current_admin_user)):
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    new_status = not project["is_published"]
-    await db.projects.update_one(
-        {"id": project_id}, 
-        {"$set": {"is_published": new_status, "updated_at": datetime.utcnow()}}
+async def toggle_project_status(
+    project_id: str,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_admin_user)
+):
+    updated_project = await find_one_and_update_versioned(
+        db.projects, {"id": project_id}, toggle_published_pipeline(), if_match, "Project not found"
     )
-    
-    updated_project = await db.projects.find_one({"id": project_id})
+    await adjust_dashboard_counters(published_projects=1 if updated_project["is_published"] else -1)
+    await project_changed(project_id, updated_project)
+    set_version_etag(response, updated_project)
     return Project(**updated_project)
 
 # Site Settings Routes
-@api_router.get("/settings", response_model=SiteSettings)
-async def get_settings():
+async def load_settings():
     settings = await db.settings.find_one()
     if not settings:
         # Return default settings if none exist
@@ -400,79 +1587,1614 @@ async def get_settings():
         return default_settings
     return SiteSettings(**settings)
 
+@api_router.get("/settings", response_model=SiteSettings)
+async def get_settings():
+    return await read_through("settings", load_settings)
+
 @api_router.put("/settings", response_model=SiteSettings)
-async def update_settings(settings_update: SiteSettingsUpdate, current_user: User = Depends(get_current_admin_user)):
-    settings = await db.settings.find_one()
-    if not settings:
-        raise HTTPException(status_code=404, detail="Settings not found")
-    
+async def update_settings(
+    settings_update: SiteSettingsUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_admin_user)
+):
     update_data = settings_update.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     
-    await db.settings.update_one({}, {"$set": update_data})
-    updated_settings = await db.settings.find_one()
+    updated_settings = await find_one_and_update_versioned(
+        db.settings, {}, versioned_update(update_data), if_match, "Settings not found"
+    )
+    invalidate_settings_cache()
+    await record_changes("settings", [updated_settings["id"]])
+    set_version_etag(response, updated_settings)
     return SiteSettings(**updated_settings)
 
+# Site Snapshot Routes
+class SiteSnapshot:
+    def __init__(self, body: bytes):
+        # Built in a worker thread since compressing a large snapshot would stall the event loop
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.brotli_body = brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY) if brotli else None
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+async def build_site_snapshot():
+    pages, projects, settings = await asyncio.gather(
+        read_through("pages:published", load_published_pages),
+        read_through("projects:published", load_published_projects),
+        read_through("settings", load_settings)
+    )
+    payload = jsonable_encoder({"pages": pages, "projects": projects, "settings": settings})
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return await asyncio.get_running_loop().run_in_executor(None, SiteSnapshot, body)
+
+@api_router.get("/site")
+async def get_site_snapshot(request: Request):
+    snapshot = await read_through("site:snapshot", build_site_snapshot)
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": SITE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding"
+    }
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    if snapshot.brotli_body is not None and accepts_encoding(request, "br"):
+        headers["Content-Encoding"] = "br"
+        return Response(content=snapshot.brotli_body, media_type="application/json", headers=headers)
+    if accepts_encoding(request, "gzip"):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+# Search Index
+def flatten_text(value: Any):
+    if isinstance(value, str):
+        if not value.startswith(("http://", "https://")):
+            yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from flatten_text(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from flatten_text(item)
+
+def build_search_document(kind: str, key: str, document: dict):
+    if kind == "page":
+        subtitle = document.get("subtitle")
+        keywords = document.get("meta_keywords")
+        body_parts = [document.get("meta_description") or "", *flatten_text(document.get("content", {}))]
+    else:
+        subtitle = None
+        keywords = document.get("key_areas")
+        body_parts = [document.get("description") or ""]
+    return {
+        "_id": f"{kind}:{key}",
+        "kind": kind,
+        "key": key,
+        "title": document.get("title") or "",
+        "subtitle": subtitle or "",
+        "keywords": keywords or "",
+        "body": " ".join(part for part in body_parts if part),
+        "is_published": document.get("is_published", True),
+        "updated_at": document.get("updated_at"),
+        "indexed_at": datetime.utcnow()
+    }
+
+async def update_search_document(kind: str, key: str, document: Optional[dict]):
+    if document is None:
+        await db.search_index.delete_one({"_id": f"{kind}:{key}"})
+    else:
+        search_document = build_search_document(kind, key, document)
+        await db.search_index.replace_one({"_id": search_document["_id"]}, search_document, upsert=True)
+
+def rebuild_search_request(search_document: dict):
+    # Writes made through update_search_document after the scan carry newer content; those entries are
+    # left alone, and the upsert then fails on the existing _id instead of overwriting them
+    query = {"_id": search_document["_id"]}
+    if search_document["updated_at"] is None:
+        query["updated_at"] = None
+    else:
+        query["$or"] = [{"updated_at": {"$lte": search_document["updated_at"]}}, {"updated_at": None}]
+    return ReplaceOne(query, search_document, upsert=True)
+
+async def rebuild_search_index():
+    started_at = datetime.utcnow()
+    search_documents = []
+    async for page in db.pages.find({}, {"_id": 0}):
+        search_documents.append(build_search_document("page", page["page_name"], page))
+    async for project in db.projects.find({}, {"_id": 0}):
+        search_documents.append(build_search_document("project", project["id"], project))
+    
+    indexed_ids = [document["_id"] for document in search_documents]
+    requests = [rebuild_search_request(document) for document in search_documents]
+    for start in range(0, len(requests), 500):
+        try:
+            await db.search_index.bulk_write(requests[start:start + 500], ordered=False)
+        except BulkWriteError as e:
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+    # Entries indexed after the scan started belong to pages and projects written since then
+    await db.search_index.delete_many({"_id": {"$nin": indexed_ids}, "indexed_at": {"$not": {"$gte": started_at}}})
+    await remove_deleted_search_documents(search_documents)
+    return len(requests)
+
+async def remove_deleted_search_documents(search_documents: List[dict]):
+    # A page or project deleted after the scan has already had its entry removed, which lets the rebuild's
+    # upsert insert the stale copy again. Entries are only dropped while they still hold the scanned copy,
+    # so a document re-created under the same key keeps the newer entry written by its own update
+    page_names = [document["key"] for document in search_documents if document["kind"] == "page"]
+    project_ids = [document["key"] for document in search_documents if document["kind"] == "project"]
+    existing = {
+        f"page:{name}" for name in await db.pages.distinct("page_name", {"page_name": {"$in": page_names}})
+    } | {
+        f"project:{project_id}" for project_id in await db.projects.distinct("id", {"id": {"$in": project_ids}})
+    }
+    requests = [
+        DeleteOne({"_id": document["_id"], "updated_at": document["updated_at"]})
+        for document in search_documents
+        if document["_id"] not in existing
+    ]
+    if requests:
+        await db.search_index.bulk_write(requests, ordered=False)
+
+async def ensure_search_index():
+    if await db.search_index.estimated_document_count() == 0:
+        indexed = await rebuild_search_index()
+        if indexed:
+            logger.info(f"Built search index for {indexed} pages and projects")
+
+def search_terms(query: str):
+    terms = []
+    for term in re.findall(r'"[^"]+"|\S+', query):
+        term = term.strip('"')
+        if term and not term.startswith("-"):
+            terms.append(term)
+    return terms
+
+def search_snippet(document: dict, terms: List[str]):
+    text = document["body"] or document["subtitle"] or document["title"]
+    lowered = text.lower()
+    positions = [position for position in (lowered.find(term.lower()) for term in terms) if position >= 0]
+    start = max(min(positions) - SEARCH_SNIPPET_CHARS // 4, 0) if positions else 0
+    end = min(start + SEARCH_SNIPPET_CHARS, len(text))
+    excerpt = text[start:end]
+    # Matches are found in the raw text so they can never land inside an escaped entity
+    parts = []
+    position = 0
+    if terms:
+        pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+        for match in pattern.finditer(excerpt):
+            parts.append(html.escape(excerpt[position:match.start()]))
+            parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+            position = match.end()
+    parts.append(html.escape(excerpt[position:]))
+    return f"{'…' if start > 0 else ''}{''.join(parts)}{'…' if end < len(text) else ''}"
+
+# Search Routes
+@api_router.get("/search", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[Literal["page", "project"]] = None,
+    limit: int = Query(20, ge=1, le=100),
+    published_only: bool = True,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    if not published_only:
+        # Unpublished content is only searchable by admins
+        if credentials is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        await get_current_admin_user(await get_current_user(credentials))
+    
+    query = {"$text": {"$search": q}}
+    if published_only:
+        query["is_published"] = True
+    if kind:
+        query["kind"] = kind
+    search_cursor = db.search_index.find(query, {"score": {"$meta": "textScore"}})
+    documents = await search_cursor.sort([("score", {"$meta": "textScore"})]).to_list(limit)
+    
+    terms = search_terms(q)
+    return SearchResponse(
+        query=q,
+        results=[
+            SearchResult(
+                kind=document["kind"],
+                key=document["key"],
+                title=document["title"],
+                snippet=search_snippet(document, terms),
+                score=document["score"],
+                is_published=document["is_published"]
+            )
+            for document in documents
+        ]
+    )
+
+@api_router.post("/search/reindex")
+async def reindex_search(
+    response: Response,
+    background: bool = False,
+    current_user: User = Depends(get_current_admin_user)
+):
+    if background:
+        job = await enqueue_job("search.reindex", dedupe_key="search.reindex")
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": "Search index rebuild queued", "job_id": job.id}
+    indexed = await rebuild_search_index()
+    return {"message": "Search index rebuilt successfully", "indexed": indexed}
+
+# Media Storage Helpers
+async def store_media_stream(file: UploadFile, filename: str):
+    storage_id = str(uuid.uuid4())
+    grid_in = media_bucket.open_upload_stream_with_id(
+        storage_id,
+        filename,
+        metadata={"content_type": file.content_type}
+    )
+    file_size = 0
+    digest = hashlib.sha256()
+    try:
+        while True:
+            chunk = await file.read(MEDIA_CHUNK_SIZE)
+            if not chunk:
+                break
+            file_size += len(chunk)
+            digest.update(chunk)
+            await grid_in.write(chunk)
+    except Exception:
+        await grid_in.abort()
+        raise
+    await grid_in.close()
+    return storage_id, file_size, digest.hexdigest()
+
+async def iter_media_chunks(storage_id: str, start: int = 0, end: Optional[int] = None):
+    grid_out = await media_bucket.open_download_stream(storage_id)
+    if end is None:
+        end = grid_out.length - 1
+    if start:
+        grid_out.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = await grid_out.read(min(MEDIA_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+async def hash_upload(file: UploadFile):
+    # The upload is already spooled locally, so hashing it first avoids writing duplicates to GridFS
+    digest = hashlib.sha256()
+    file_size = 0
+    while True:
+        chunk = await file.read(MEDIA_CHUNK_SIZE)
+        if not chunk:
+            break
+        file_size += len(chunk)
+        digest.update(chunk)
+    await file.seek(0)
+    return digest.hexdigest(), file_size
+
+async def hash_media_blob(storage_id: str):
+    digest = hashlib.sha256()
+    async for chunk in iter_media_chunks(storage_id):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+async def delete_media_blob(storage_id: str):
+    try:
+        await media_bucket.delete(storage_id)
+    except NoFile:
+        logger.warning(f"Media blob {storage_id} was already missing from GridFS")
+
+async def migrate_base64_media():
+    # Move legacy base64 `file_data` documents into GridFS one document at a time
+    migrated = 0
+    async for media in db.media.find({"file_data": {"$exists": True}}).batch_size(1):
+        storage_id = str(uuid.uuid4())
+        file_data = base64.b64decode(media["file_data"])
+        await media_bucket.upload_from_stream_with_id(
+            storage_id,
+            media["filename"],
+            file_data,
+            metadata={"content_type": media["file_type"]}
+        )
+        await db.media.update_one(
+            {"_id": media["_id"]},
+            {
+                "$set": {
+                    "storage_id": storage_id,
+                    "file_size": len(file_data),
+                    "content_hash": hashlib.sha256(file_data).hexdigest()
+                },
+                "$unset": {"file_data": ""}
+            }
+        )
+        migrated += 1
+    if migrated:
+        logger.info(f"Migrated {migrated} base64 media files to GridFS")
+    
+    # Backfill content hashes for media stored before ETags were introduced
+    async for media in db.media.find({"content_hash": None}, {"_id": 1, "storage_id": 1}):
+        content_hash = await hash_media_blob(media["storage_id"])
+        await db.media.update_one({"_id": media["_id"]}, {"$set": {"content_hash": content_hash}})
+
+# Content-addressed blobs: one GridFS file per SHA-256, shared by every MediaFile with that hash
+async def acquire_media_blob(file: UploadFile, filename: str):
+    content_hash, file_size = await hash_upload(file)
+    for _ in range(3):
+        blob = await db.media_blobs.find_one_and_update(
+            {"_id": content_hash, "ref_count": {"$gt": 0}},
+            {"$inc": {"ref_count": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if blob:
+            return blob, False
+        
+        storage_id, file_size, _ = await store_media_stream(file, filename)
+        blob = {
+            "_id": content_hash,
+            "storage_id": storage_id,
+            "file_size": file_size,
+            "file_type": file.content_type,
+            "ref_count": 1,
+            "created_at": datetime.utcnow()
+        }
+        try:
+            await db.media_blobs.insert_one(blob)
+            return blob, True
+        except DuplicateKeyError:
+            # An identical upload won the race, or the last reference is being released; retry
+            await delete_media_blob(storage_id)
+            await file.seek(0)
+    raise HTTPException(status_code=409, detail="Media upload conflicted with a concurrent change, please retry")
+
+async def release_media_blob(content_hash: str):
+    blob = await db.media_blobs.find_one_and_update(
+        {"_id": content_hash},
+        {"$inc": {"ref_count": -1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if blob is None or blob["ref_count"] > 0:
+        return
+    result = await db.media_blobs.delete_one({"_id": content_hash, "ref_count": {"$lte": 0}})
+    if result.deleted_count:
+        await delete_media_blob(blob["storage_id"])
+        for derivative in (blob.get("derivatives") or {}).values():
+            await delete_media_blob(derivative["storage_id"])
+
+async def reconcile_media_blobs():
+    # One-time migration from per-upload GridFS files to shared blobs. After it has run, reference
+    # counts are only changed by acquire/release, since a recount here would race concurrent writers
+    if await db.migrations.count_documents({"_id": "media_blobs"}, limit=1):
+        return
+    freed = 0
+    async for group in db.media.aggregate([
+        {"$group": {"_id": "$content_hash", "count": {"$sum": 1}, "storage_ids": {"$addToSet": "$storage_id"}}}
+    ]):
+        content_hash = group["_id"]
+        if content_hash is None:
+            continue
+        blob = await db.media_blobs.find_one({"_id": content_hash})
+        created = blob is None
+        if created:
+            sample = await db.media.find_one({"content_hash": content_hash, "storage_id": group["storage_ids"][0]})
+            blob = {
+                "_id": content_hash,
+                "storage_id": sample["storage_id"],
+                "file_size": sample["file_size"],
+                "file_type": sample["file_type"],
+                "ref_count": group["count"],
+                "created_at": sample["uploaded_at"]
+            }
+            if "derivatives" in sample:
+                blob["derivatives"] = sample["derivatives"]
+            try:
+                await db.media_blobs.insert_one(blob)
+            except DuplicateKeyError:
+                # An upload created the blob meanwhile; the copies below are folded into it like any other
+                blob, created = await db.media_blobs.find_one({"_id": content_hash}), False
+        
+        # Fold pre-dedup copies onto the blob. A blob created above already counts them; one made by an
+        # upload only counts its own media, so each copy folded into it adds a reference first
+        for media in await db.media.find(
+            {"content_hash": content_hash, "storage_id": {"$ne": blob["storage_id"]}}
+        ).to_list(None):
+            if not created:
+                await db.media_blobs.update_one({"_id": content_hash}, {"$inc": {"ref_count": 1}})
+            update = {"storage_id": blob["storage_id"]}
+            if "derivatives" in blob:
+                update["derivatives"] = blob["derivatives"]
+            await db.media.update_one({"_id": media["_id"]}, {"$set": update})
+            await delete_media_blob(media["storage_id"])
+            for derivative in (media.get("derivatives") or {}).values():
+                await delete_media_blob(derivative["storage_id"])
+            freed += 1
+    
+    await db.migrations.update_one(
+        {"_id": "media_blobs"}, {"$set": {"completed_at": datetime.utcnow()}}, upsert=True
+    )
+    if freed:
+        logger.info(f"Removed {freed} duplicate media copies")
+
+def media_etag(media: dict):
+    if not media.get("content_hash"):
+        return None
+    return f'"{media["content_hash"]}"'
+
+def media_last_modified(timestamp: datetime):
+    return timestamp.replace(tzinfo=timezone.utc, microsecond=0)
+
+def is_media_not_modified(request: Request, etag: Optional[str], last_modified: datetime):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+def parse_range_header(range_header: str, file_size: int):
+    # Only single byte ranges are supported; anything else falls back to a full response
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else file_size - 1
+        else:
+            suffix_length = int(end_text)
+            if suffix_length <= 0:
+                raise HTTPException(
+                    status_code=416,
+                    detail="Requested range not satisfiable",
+                    headers={"Content-Range": f"bytes */{file_size}"}
+                )
+            start = max(file_size - suffix_length, 0)
+            end = file_size - 1
+    except ValueError:
+        return None
+    if start >= file_size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{file_size}"}
+        )
+    return start, min(end, file_size - 1)
+
+# Image Derivatives
+def render_derivatives(data: bytes, file_type: str):
+    # Runs in media_executor; returns (key, body, content type, width, height) tuples
+    original_format = MEDIA_DERIVATIVE_FORMATS[file_type]
+    rendered = []
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        for size_name, max_dimension in MEDIA_DERIVATIVE_SIZES.items():
+            # Never upscale; the original already serves sizes it does not exceed
+            if max(source.size) <= max_dimension:
+                continue
+            image = source.copy()
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+            for key, image_format, content_type in (
+                (size_name, original_format, file_type),
+                (f"{size_name}.webp", "WEBP", "image/webp"),
+            ):
+                if key.endswith(".webp") and original_format == "WEBP":
+                    continue
+                output = io.BytesIO()
+                if image_format == "JPEG":
+                    image.convert("RGB").save(output, "JPEG", quality=85, optimize=True, progressive=True)
+                elif image_format == "PNG":
+                    image.save(output, "PNG", optimize=True)
+                else:
+                    image.save(output, "WEBP", quality=80, method=4)
+                rendered.append((key, output.getvalue(), content_type, image.width, image.height))
+    return rendered
+
+async def generate_media_derivatives(content_hash: str):
+    blob = await db.media_blobs.find_one({"_id": content_hash})
+    if not blob or blob["file_type"] not in MEDIA_DERIVATIVE_FORMATS:
+        return
+    data = b"".join([chunk async for chunk in iter_media_chunks(blob["storage_id"])])
+    try:
+        rendered = await asyncio.get_running_loop().run_in_executor(
+            media_executor, render_derivatives, data, blob["file_type"]
+        )
+    except (Image.UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        # Retrying cannot fix a corrupt, mislabelled or oversized file; an empty set serves the original as final
+        logger.warning(f"Could not render derivatives for media blob {content_hash}: {e}")
+        rendered = []
+    
+    derivatives = {}
+    for key, body, content_type, width, height in rendered:
+        storage_id = str(uuid.uuid4())
+        await media_bucket.upload_from_stream_with_id(
+            storage_id, f"{key}_{content_hash}", body, metadata={"content_type": content_type}
+        )
+        derivatives[key] = MediaDerivative(
+            storage_id=storage_id,
+            file_type=content_type,
+            file_size=len(body),
+            width=width,
+            height=height,
+            content_hash=hashlib.sha256(body).hexdigest()
+        ).dict()
+    
+    previous = await db.media_blobs.find_one_and_update(
+        {"_id": content_hash, "ref_count": {"$gt": 0}},
+        {"$set": {"derivatives": derivatives}},
+        projection={"derivatives": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    if previous is None:
+        # Every media file using this blob was deleted while its derivatives were being rendered
+        for derivative in derivatives.values():
+            await delete_media_blob(derivative["storage_id"])
+        return
+    await db.media.update_many({"content_hash": content_hash}, {"$set": {"derivatives": derivatives}})
+    # Regenerating replaces every derivative, so the files of the previous set are no longer referenced
+    for derivative in (previous.get("derivatives") or {}).values():
+        await delete_media_blob(derivative["storage_id"])
+    media_ids = [media["id"] async for media in db.media.find({"content_hash": content_hash}, {"id": 1})]
+    await record_changes("media", media_ids)
+
+async def schedule_media_derivatives(content_hash: str, file_type: str):
+    if Image is None or file_type not in MEDIA_DERIVATIVE_FORMATS:
+        return
+    await enqueue_job(
+        "media.derivatives", {"content_hash": content_hash}, dedupe_key=f"media.derivatives:{content_hash}"
+    )
+
+async def schedule_missing_derivatives():
+    if Image is None:
+        return
+    query = {"file_type": {"$in": list(MEDIA_DERIVATIVE_FORMATS)}, "derivatives": {"$exists": False}}
+    async for blob in db.media_blobs.find(query, {"_id": 1, "file_type": 1}):
+        await schedule_media_derivatives(blob["_id"], blob["file_type"])
+
+def select_media_blob(media: dict, size: Optional[str], image_format: Optional[str]):
+    if not size:
+        return media, False
+    key = f"{size}.webp" if image_format == "webp" else size
+    derivatives = media.get("derivatives") or {}
+    if key in derivatives:
+        return derivatives[key], False
+    if size in derivatives:
+        return derivatives[size], False
+    # Derivatives are still pending or the original is already smaller than the requested size
+    pending = media["file_type"] in MEDIA_DERIVATIVE_FORMATS and "derivatives" not in media
+    return media, pending
+
 # Media Management Routes
 @api_router.post("/media/upload", response_model=MediaFile)
 async def upload_media(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_admin_user)
 ):
-    file_data = await file.read()
-    file_base64 = base64.b64encode(file_data).decode()
+    filename = f"{uuid.uuid4()}_{file.filename}"
+    blob, is_new_blob = await acquire_media_blob(file, filename)
     
     media_file = MediaFile(
-        filename=f"{uuid.uuid4()}_{file.filename}",
+        filename=filename,
         original_filename=file.filename,
         file_type=file.content_type,
-        file_size=len(file_data),
-        file_data=file_base64
+        file_size=blob["file_size"],
+        storage_id=blob["storage_id"],
+        content_hash=blob["_id"],
+        derivatives=blob.get("derivatives") or {}
     )
     
-    await db.media.insert_one(media_file.dict())
+    # Media without a derivatives field is still waiting for its renditions
+    exclude = None if "derivatives" in blob else {"derivatives"}
+    try:
+        await db.media.insert_one(media_file.dict(exclude=exclude))
+    except Exception:
+        await release_media_blob(blob["_id"])
+        raise
+    await adjust_dashboard_counters(
+        total_media=1,
+        total_media_bytes=media_file.file_size,
+        media_type=(media_file.file_type, 1, media_file.file_size)
+    )
+    await record_changes("media", [media_file.id])
+    if is_new_blob:
+        await schedule_media_derivatives(blob["_id"], media_file.file_type)
     return media_file
 
-@api_router.get("/media", response_model=List[MediaFile])
-async def get_media(current_user: User = Depends(get_current_admin_user)):
-    media_files = await db.media.find().to_list(1000)
-    return [MediaFile(**media) for media in media_files]
+MEDIA_SORT_FIELDS = {"uploaded_at", "file_size", "file_type"}
+
+@api_router.get("/media", response_model=MediaFilePage)
+async def get_media(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    sort_by: str = "uploaded_at",
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    file_type: Optional[str] = None,
+    current_user: User = Depends(get_current_admin_user)
+):
+    if sort_by not in MEDIA_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Cannot sort media by '{sort_by}'")
+    
+    query = {}
+    if file_type:
+        # "image/*" matches every subtype of a MIME family
+        if file_type.endswith("/*"):
+            query["file_type"] = {"$regex": f"^{re.escape(file_type[:-1])}"}
+        else:
+            query["file_type"] = file_type
+    
+    direction = 1 if order == "asc" else -1
+    page_query = {**query, **keyset_filter(sort_by, direction, cursor)}
+    media_cursor = db.media.find(page_query, {"_id": 0, "file_data": 0})
+    media_cursor = media_cursor.sort([(sort_by, direction), ("id", direction)]).limit(limit + 1)
+    media_files = await media_cursor.to_list(limit + 1)
+    total = await db.media.count_documents(query)
+    
+    next_cursor = None
+    if len(media_files) > limit:
+        media_files = media_files[:limit]
+        last = media_files[-1]
+        next_cursor = encode_cursor(last[sort_by], last["id"])
+    
+    if FAST_RESPONSES:
+        return fast_response({"items": to_models(MediaFile, media_files), "total": total, "next_cursor": next_cursor})
+    return MediaFilePage(
+        items=to_models(MediaFile, media_files),
+        total=total,
+        next_cursor=next_cursor
+    )
 
 @api_router.get("/media/{media_id}")
-async def get_media_file(media_id: str):
+async def get_media_file(
+    media_id: str,
+    request: Request,
+    size: Optional[Literal["thumbnail", "medium", "large"]] = None,
+    image_format: Optional[Literal["webp"]] = Query(None, alias="format")
+):
+    if image_format and not size:
+        # Only resized derivatives are re-encoded; the original is always served as uploaded
+        raise HTTPException(status_code=400, detail="The format parameter requires a size")
     media = await db.media.find_one({"id": media_id})
     if not media:
         raise HTTPException(status_code=404, detail="Media file not found")
     
-    file_data = base64.b64decode(media["file_data"])
-    return Response(
-        content=file_data,
-        media_type=media["file_type"],
-        headers={"Content-Disposition": f"inline; filename={media['original_filename']}"}
+    blob, pending = select_media_blob(media, size, image_format)
+    etag = media_etag(blob)
+    last_modified = media_last_modified(blob.get("created_at") or media["uploaded_at"])
+    headers = {
+        # A pending derivative must not be cached as if it were the final rendition
+        "Cache-Control": "no-cache" if pending else MEDIA_CACHE_CONTROL,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Accept-Ranges": "bytes"
+    }
+    if etag:
+        headers["ETag"] = etag
+    
+    if is_media_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    
+    headers["Content-Disposition"] = f"inline; filename={media['original_filename']}"
+    file_size = blob["file_size"]
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and file_size > 0:
+        if_range = request.headers.get("if-range")
+        if not if_range or (etag is not None and if_range.strip() == etag):
+            byte_range = parse_range_header(range_header, file_size)
+    
+    if byte_range is None:
+        headers["Content-Length"] = str(file_size)
+        return StreamingResponse(
+            iter_media_chunks(blob["storage_id"]),
+            media_type=blob["file_type"],
+            headers=headers
+        )
+    
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_media_chunks(blob["storage_id"], start, end),
+        status_code=206,
+        media_type=blob["file_type"],
+        headers=headers
     )
 
 @api_router.delete("/media/{media_id}")
 async def delete_media(media_id: str, current_user: User = Depends(get_current_admin_user)):
-    result = await db.media.delete_one({"id": media_id})
-    if result.deleted_count == 0:
+    media = await db.media.find_one_and_delete({"id": media_id})
+    if not media:
         raise HTTPException(status_code=404, detail="Media file not found")
+    await release_media_blob(media["content_hash"])
+    await adjust_dashboard_counters(
+        total_media=-1,
+        total_media_bytes=-media["file_size"],
+        media_type=(media["file_type"], -1, -media["file_size"])
+    )
+    await record_changes("media", [media_id], deleted=True)
     return {"message": "Media file deleted successfully"}
 
+# Change Feed
+change_subscribers = set()
+change_log_lock = asyncio.Lock()
+
+async def record_changes(kind: str, keys: List[str], deleted: bool = False):
+    if not keys:
+        return
+    # Serializing allocation and insert keeps this process's entries in order. Another worker can still
+    # insert a later sequence first, so load_changes holds readers back at young gaps
+    async with change_log_lock:
+        counter = await db.counters.find_one_and_update(
+            {"_id": "changes"},
+            {"$inc": {"seq": len(keys)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        first_seq = counter["seq"] - len(keys) + 1
+        now = datetime.utcnow()
+        entries = [
+            {"seq": first_seq + offset, "kind": kind, "key": key, "deleted": deleted, "at": now}
+            for offset, key in enumerate(keys)
+        ]
+        await db.changes.insert_many(entries)
+    for entry in entries:
+        entry.pop("_id", None)
+        for queue in list(change_subscribers):
+            try:
+                queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                # Slow consumers are dropped and resume from Last-Event-ID on reconnect
+                change_subscribers.discard(queue)
+    schedule_static_export(kind, keys)
+
+async def current_change_seq():
+    counter = await db.counters.find_one({"_id": "changes"})
+    return counter["seq"] if counter else 0
+
+CHANGE_FEED_SOURCES = {
+    "page": ("pages", "page_name", PageContent),
+    "project": ("projects", "id", Project),
+    "settings": ("settings", "id", SiteSettings),
+    "media": ("media", "id", MediaFile),
+}
+
+async def load_changes(since: int):
+    current_seq = await current_change_seq()
+    oldest = await db.changes.find_one({}, {"seq": 1}, sort=[("seq", ASCENDING)])
+    first_retained = oldest["seq"] if oldest else current_seq + 1
+    if since > current_seq or since < first_retained - 1:
+        return {"cursor": current_seq, "reset": True, "has_more": False}
+    
+    changes_cursor = db.changes.find({"seq": {"$gt": since}}, {"_id": 0}).sort("seq", ASCENDING)
+    entries = await changes_cursor.to_list(CHANGE_FEED_BATCH_SIZE)
+    
+    # A missing sequence followed by recent entries is most likely still being inserted by another worker;
+    # stopping before it keeps the client's cursor from skipping that change. Old gaps are from failed writes
+    gap_cutoff = datetime.utcnow() - timedelta(seconds=CHANGE_FEED_GAP_GRACE_SECONDS)
+    expected_seq = since + 1
+    for index, entry in enumerate(entries):
+        if entry["seq"] != expected_seq and entry["at"] > gap_cutoff:
+            entries = entries[:index]
+            break
+        expected_seq = entry["seq"] + 1
+    cursor = entries[-1]["seq"] if entries else since
+    
+    # Only the latest entry per document matters: it is either a tombstone or a fetch of the current state
+    latest = {}
+    for entry in entries:
+        latest[(entry["kind"], entry["key"])] = entry["deleted"]
+    
+    changes = {"pages": [], "projects": [], "settings": None, "media": []}
+    deleted = {"pages": [], "projects": [], "media": []}
+    for kind, (collection_name, key_field, model_class) in CHANGE_FEED_SOURCES.items():
+        keys = [key for (entry_kind, key), is_deleted in latest.items() if entry_kind == kind and not is_deleted]
+        tombstones = [key for (entry_kind, key), is_deleted in latest.items() if entry_kind == kind and is_deleted]
+        documents = []
+        if keys:
+            projection = {"_id": 0, "file_data": 0} if kind == "media" else {"_id": 0}
+            documents = await db[collection_name].find({key_field: {"$in": keys}}, projection).to_list(None)
+            # Documents removed after their change entry was read are reported as deleted
+            found = {document[key_field] for document in documents}
+            tombstones += [key for key in keys if key not in found]
+        if kind == "settings":
+            changes["settings"] = to_model(SiteSettings, documents[0]) if documents else None
+        else:
+            changes[collection_name] = to_models(model_class, documents)
+            deleted[collection_name] = tombstones
+    
+    return {
+        "cursor": cursor,
+        "reset": False,
+        "has_more": len(entries) == CHANGE_FEED_BATCH_SIZE and cursor < current_seq,
+        **changes,
+        "deleted": deleted
+    }
+
+async def get_admin_from_token(credentials: Optional[HTTPAuthorizationCredentials], token: Optional[str]):
+    # EventSource cannot send headers, so the stream also accepts ?token=
+    if credentials is None and token:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_admin_user(await get_current_user(credentials))
+
+@api_router.get("/changes")
+async def get_changes(since: Optional[int] = Query(None, ge=0), current_user: User = Depends(get_current_admin_user)):
+    if since is None:
+        # Clients take the current cursor before their initial full load
+        return {"cursor": await current_change_seq(), "reset": True, "has_more": False}
+    return jsonable_encoder(await load_changes(since))
+
+@api_router.get("/changes/stream")
+async def stream_changes(
+    request: Request,
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    await get_admin_from_token(credentials, token)
+    # Live events only carry writes made by this process. With several workers, clients should treat an
+    # event as a hint and sync through GET /changes, which is the ordered, gap-aware view of the log
+    last_event_id = request.headers.get("last-event-id")
+    since = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    
+    queue = asyncio.Queue(maxsize=1000)
+    change_subscribers.add(queue)
+    
+    def format_event(entry: dict):
+        return f"id: {entry['seq']}\nevent: change\ndata: {json.dumps(jsonable_encoder(entry))}\n\n"
+    
+    async def events():
+        last_seq = since or 0
+        try:
+            if since is not None:
+                # Replay anything missed while disconnected before switching to live events
+                backlog_cursor = db.changes.find({"seq": {"$gt": since}}, {"_id": 0}).sort("seq", ASCENDING)
+                async for entry in backlog_cursor:
+                    last_seq = entry["seq"]
+                    yield format_event(entry)
+            while queue in change_subscribers and not await request.is_disconnected():
+                try:
+                    entry = await asyncio.wait_for(queue.get(), timeout=CHANGE_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if entry["seq"] <= last_seq:
+                    continue
+                last_seq = entry["seq"]
+                yield format_event(entry)
+        finally:
+            change_subscribers.discard(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Static Export
+# Files mirror the public GET routes (api/pages/<name>.json, api/site.json, api/media/<id>, ...)
+# so a web server can answer them with try_files and only fall through to the API for writes
+MEDIA_REFERENCE_PATTERN = re.compile(r"/api/media/([0-9a-fA-F-]{36})")
+STATIC_SEGMENT_PATTERN = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9._-]*")
+static_export_pending = set()
+static_export_task = None
+
+def is_static_segment(kind: str, key: str):
+    # /api/<kind>s/published is the list route, so an item by that name is never served individually
+    if STATIC_SEGMENT_PATTERN.fullmatch(key) and key != "published":
+        return True
+    logger.warning(f"{kind.capitalize()} key {key!r} is not a safe file name; skipping its static export")
+    return False
+
+def static_json(payload: Any):
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def write_static_artifacts(root: Path, artifacts: Dict[str, Optional[bytes]]):
+    # Each file is written beside its target and renamed over it, so readers never see a partial file
+    written = 0
+    for relative, body in artifacts.items():
+        path = root / relative
+        if body is None:
+            path.unlink(missing_ok=True)
+            continue
+        if path.exists() and path.stat().st_size == len(body) and path.read_bytes() == body:
+            continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        temp_path.write_bytes(body)
+        os.replace(temp_path, path)
+        written += 1
+    return written
+
+def stale_static_artifacts(root: Path, directory: str, keep: set):
+    folder = root / directory
+    if not folder.is_dir():
+        return []
+    return [
+        f"{directory}/{path.name}" for path in folder.iterdir()
+        if path.is_file() and not path.name.startswith(".") and f"{directory}/{path.name}" not in keep
+    ]
+
+async def export_static_media(root: Path, media: dict):
+    # Media ids are never reused for different bytes, so an existing file is already current
+    path = root / "api" / "media" / media["id"]
+    if path.exists():
+        return False
+    loop = asyncio.get_running_loop()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    handle = await loop.run_in_executor(None, open, temp_path, "wb")
+    try:
+        async for chunk in iter_media_chunks(media["storage_id"]):
+            await loop.run_in_executor(None, handle.write, chunk)
+    except BaseException:
+        handle.close()
+        temp_path.unlink(missing_ok=True)
+        raise
+    handle.close()
+    os.replace(temp_path, path)
+    return True
+
+async def export_static_site(root: Path, changes: Optional[set] = None):
+    # changes holds (kind, key) pairs from the change log; None exports everything
+    full = changes is None
+    kinds = {kind for kind, _ in changes or ()}
+    changed_keys = {kind: {key for change_kind, key in changes or () if change_kind == kind} for kind in ("page", "project")}
+    artifacts: Dict[str, Optional[bytes]] = {}
+    loop = asyncio.get_running_loop()
+    
+    if full or "page" in kinds:
+        pages = jsonable_encoder(await read_through("pages:published", load_published_pages))
+        artifacts["api/pages/published.json"] = static_json(pages)
+        by_name = {page["page_name"]: page for page in pages}
+        for page_name in (by_name if full else changed_keys["page"]):
+            if not is_static_segment("page", page_name):
+                continue
+            page = by_name.get(page_name)
+            artifacts[f"api/pages/{page_name}.json"] = static_json(page) if page else None
+    
+    if full or "project" in kinds:
+        projects = jsonable_encoder(await read_through("projects:published", load_published_projects))
+        artifacts["api/projects/published.json"] = static_json(projects)
+        by_id = {project["id"]: project for project in projects}
+        for project_id in (by_id if full else changed_keys["project"]):
+            if not is_static_segment("project", project_id):
+                continue
+            project = by_id.get(project_id)
+            artifacts[f"api/projects/{project_id}.json"] = static_json(project) if project else None
+    
+    if full or "settings" in kinds:
+        artifacts["api/settings.json"] = static_json(await read_through("settings", load_settings))
+    
+    if full:
+        keep = set(artifacts)
+        for directory in ("api/pages", "api/projects"):
+            for relative in stale_static_artifacts(root, directory, keep):
+                artifacts[relative] = None
+    
+    media_written = 0
+    if full or kinds & {"page", "project", "settings", "media"}:
+        # The snapshot carries every published page, project and setting, so it also defines which media is public
+        snapshot = await read_through("site:snapshot", build_site_snapshot)
+        artifacts["api/site.json"] = snapshot.body
+        artifacts["api/site.json.gz"] = snapshot.gzip_body
+        if snapshot.brotli_body is not None:
+            artifacts["api/site.json.br"] = snapshot.brotli_body
+        referenced = set(MEDIA_REFERENCE_PATTERN.findall(snapshot.body.decode("utf-8")))
+        exported = set()
+        async for media in db.media.find({"id": {"$in": list(referenced)}}, {"_id": 0, "id": 1, "storage_id": 1}):
+            try:
+                media_written += await export_static_media(root, media)
+                exported.add(f"api/media/{media['id']}")
+            except NoFile:
+                logger.warning(f"Media {media['id']} has no stored data; skipping static export")
+        for relative in stale_static_artifacts(root, "api/media", exported):
+            artifacts[relative] = None
+    
+    written = await loop.run_in_executor(None, write_static_artifacts, root, artifacts)
+    return written + media_written
+
+async def run_static_export():
+    # Waits briefly so bursts of writes (bulk routes, reorders) are exported together
+    await asyncio.sleep(STATIC_EXPORT_DEBOUNCE_SECONDS)
+    while static_export_pending:
+        changes = set(static_export_pending)
+        static_export_pending.clear()
+        try:
+            written = await export_static_site(Path(STATIC_EXPORT_DIR), changes)
+            logger.info(f"Static export updated {written} files for {len(changes)} changes")
+        except Exception:
+            logger.exception("Static export failed; run the export-static command to rebuild")
+
+def schedule_static_export(kind: str, keys: List[str]):
+    global static_export_task
+    if not STATIC_EXPORT_DIR or not keys:
+        return
+    static_export_pending.update((kind, key) for key in keys)
+    if static_export_task is None or static_export_task.done():
+        static_export_task = asyncio.create_task(run_static_export())
+
+# Background Jobs
+job_wakeup = asyncio.Event()
+job_workers = []
+
+async def enqueue_job(job_type: str, payload: Optional[dict] = None, dedupe_key: Optional[str] = None):
+    job = Job(type=job_type, payload=payload or {}, dedupe_key=dedupe_key)
+    if dedupe_key:
+        # dedupe_active is set while a job is queued or running, and the dedupe_key_active unique index
+        # keeps it to one job per key across workers. A queued job has not read its input yet, so it
+        # covers this work; a running one may already have, so it is flagged to run again once it finishes
+        while True:
+            document = await db.jobs.find_one_and_update(
+                {"dedupe_key": dedupe_key, "dedupe_active": True, "status": "running"},
+                {"$set": {"rerun": True}},
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER
+            )
+            if document is not None:
+                break
+            try:
+                document = await db.jobs.find_one_and_update(
+                    {"dedupe_key": dedupe_key, "dedupe_active": True, "status": "queued"},
+                    {"$setOnInsert": job.dict(exclude={"dedupe_key"})},
+                    upsert=True,
+                    projection={"_id": 0},
+                    return_document=ReturnDocument.AFTER
+                )
+                break
+            except DuplicateKeyError:
+                # A concurrent enqueue inserted the job first, or it was claimed in between; look again
+                continue
+        job = Job(**document)
+    else:
+        await db.jobs.insert_one(job.dict())
+    job_wakeup.set()
+    return job
+
+async def claim_job():
+    now = datetime.utcnow()
+    return await db.jobs.find_one_and_update(
+        {"$or": [
+            {"status": "queued", "run_at": {"$lte": now}},
+            # A worker that died mid-job stops renewing its lease, so the job is picked up again
+            {"status": "running", "lease_expires_at": {"$lt": now}},
+        ]},
+        {
+            "$set": {
+                "status": "running",
+                "lease_id": str(uuid.uuid4()),
+                "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                "updated_at": now
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("run_at", ASCENDING)],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def renew_job_lease(job: dict):
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        await db.jobs.update_one(
+            {"id": job["id"], "lease_id": job["lease_id"]},
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)}}
+        )
+
+async def run_job(job: dict):
+    lease_task = asyncio.create_task(renew_job_lease(job))
+    try:
+        handler = JOB_HANDLERS.get(job["type"])
+        if handler is None:
+            raise ValueError(f"No handler for job type '{job['type']}'")
+        if job["attempts"] > job["max_attempts"]:
+            raise RuntimeError("Job lease expired on its final attempt")
+        result = await handler(**job["payload"])
+        update = {"status": "succeeded", "result": jsonable_encoder(result), "finished_at": datetime.utcnow()}
+        finished = True
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        if job["attempts"] < job["max_attempts"]:
+            delay = JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1)
+            update = {"status": "queued", "run_at": datetime.utcnow() + timedelta(seconds=delay), "last_error": error}
+            finished = False
+            logger.warning(f"Job {job['id']} ({job['type']}) failed, retrying in {delay:.0f}s: {error}")
+        else:
+            update = {"status": "failed", "last_error": error, "finished_at": datetime.utcnow()}
+            finished = True
+            logger.error(f"Job {job['id']} ({job['type']}) failed after {job['attempts']} attempts: {error}")
+    finally:
+        lease_task.cancel()
+    update.update({"lease_expires_at": None, "updated_at": datetime.utcnow()})
+    # A job whose lease was taken over by another worker is left to that worker
+    await db.jobs.update_one(
+        {"id": job["id"], "lease_id": job["lease_id"]},
+        finish_job_pipeline(update) if finished else {"$set": update}
+    )
+
+def finish_job_pipeline(update: dict):
+    # Evaluated server-side so a rerun requested by enqueue_job up to this moment is never lost: the job
+    # is queued again from scratch instead of finishing, and keeps its dedupe key
+    rerun = {"$eq": ["$rerun", True]}
+    fields = {field: {"$literal": value} for field, value in update.items()}
+    fields.update({
+        "status": {"$cond": [rerun, "queued", update["status"]]},
+        "finished_at": {"$cond": [rerun, "$$REMOVE", update["finished_at"]]},
+        "run_at": {"$cond": [rerun, update["updated_at"], "$run_at"]},
+        "attempts": {"$cond": [rerun, 0, "$attempts"]},
+        "dedupe_active": {"$cond": [rerun, True, "$$REMOVE"]},
+    })
+    return [{"$set": fields}, {"$unset": "rerun"}]
+
+async def job_worker():
+    while True:
+        try:
+            job_wakeup.clear()
+            job = await claim_job()
+            if job is None:
+                try:
+                    await asyncio.wait_for(job_wakeup.wait(), timeout=JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await run_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Job worker error")
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+def start_job_workers():
+    for _ in range(JOB_WORKERS):
+        job_workers.append(asyncio.create_task(job_worker()))
+
+async def stop_job_workers():
+    # Interrupted jobs keep their lease and are retried once it expires
+    for worker in job_workers:
+        worker.cancel()
+    await asyncio.gather(*job_workers, return_exceptions=True)
+    job_workers.clear()
+
+JOB_HANDLERS = {
+    "media.derivatives": generate_media_derivatives,
+    "search.reindex": rebuild_search_index,
+}
+
+# Job Routes
+@api_router.get("/jobs", response_model=List[Job])
+async def get_jobs(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    job_status: Optional[Literal["queued", "running", "succeeded", "failed"]] = Query(None, alias="status"),
+    job_type: Optional[str] = Query(None, alias="type"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    query = {}
+    if job_status:
+        query["status"] = job_status
+    if job_type:
+        query["type"] = job_type
+    jobs, next_cursor = await find_page(db.jobs, query, "created_at", -1, limit, cursor, {"_id": 0})
+    return list_response(response, Job, jobs, None, next_cursor)
+
+@api_router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str, current_user: User = Depends(get_current_admin_user)):
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return fast_response(to_model(Job, job))
+
+@api_router.post("/jobs/{job_id}/retry", response_model=Job)
+async def retry_job(job_id: str, current_user: User = Depends(get_current_admin_user)):
+    now = datetime.utcnow()
+    try:
+        job = await db.jobs.find_one_and_update(
+            {"id": job_id, "status": "failed"},
+            {
+                "$set": {"status": "queued", "attempts": 0, "run_at": now, "updated_at": now, "dedupe_active": True},
+                "$unset": {"finished_at": ""}
+            },
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="An unfinished job with the same dedupe key already exists")
+    if job is None:
+        if await db.jobs.count_documents({"id": job_id}, limit=1):
+            raise HTTPException(status_code=409, detail="Only failed jobs can be retried")
+        raise HTTPException(status_code=404, detail="Job not found")
+    job_wakeup.set()
+    return Job(**job)
+
+# Backup and Restore
+# One JSON record per line: a header, then settings, users, pages and projects, then each media
+# blob as a "blob" record followed by base64 "chunk" records and the "media" records using it
+def backup_line(record: dict):
+    return json.dumps(jsonable_encoder(record), ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+async def export_backup(include_users: bool = True, include_media: bool = True):
+    yield backup_line({
+        "type": "header",
+        "format": BACKUP_FORMAT,
+        "version": BACKUP_FORMAT_VERSION,
+        "exported_at": datetime.utcnow()
+    })
+    settings = await db.settings.find_one({}, {"_id": 0})
+    if settings:
+        yield backup_line({"type": "settings", "data": settings})
+    sources = [("page", db.pages, "page_name"), ("project", db.projects, "id")]
+    if include_users:
+        sources.insert(0, ("user", db.users, "username"))
+    for record_type, collection, sort_field in sources:
+        async for document in collection.find({}, {"_id": 0}).sort(sort_field, ASCENDING):
+            yield backup_line({"type": record_type, "data": document})
+    if not include_media:
+        return
+    
+    # Sorting by hash puts every media file right after the blob it shares, so each blob is sent once
+    current_hash, blob = None, None
+    projection = {"_id": 0, "storage_id": 0, "derivatives": 0, "file_data": 0}
+    async for media in db.media.find({"content_hash": {"$ne": None}}, projection).sort([("content_hash", ASCENDING), ("id", ASCENDING)]):
+        if media["content_hash"] != current_hash:
+            current_hash = media["content_hash"]
+            blob = await db.media_blobs.find_one({"_id": current_hash})
+            if blob is None:
+                logger.warning(f"Media blob {current_hash} is missing; skipping its media in the export")
+                continue
+            yield backup_line({
+                "type": "blob",
+                "hash": current_hash,
+                "file_type": blob["file_type"],
+                "file_size": blob["file_size"]
+            })
+            async for chunk in iter_media_chunks(blob["storage_id"]):
+                yield backup_line({"type": "chunk", "hash": current_hash, "data": base64.b64encode(chunk).decode("ascii")})
+        if blob is not None:
+            yield backup_line({"type": "media", "data": media})
+
+async def iter_ndjson_lines(chunks):
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+class BackupImporter:
+    def __init__(self):
+        self.counts = {"settings": 0, "user": 0, "page": 0, "project": 0, "blob": 0, "media": 0, "media_skipped": 0}
+        self.pending = {"user": [], "page": [], "project": []}
+        self.blob = None  # The blob whose chunks are currently being received
+        self.grid_in = None
+        self.digest = None
+        self.received = 0
+    
+    async def flush(self, record_type: str):
+        requests = self.pending[record_type]
+        if not requests:
+            return
+        self.pending[record_type] = []
+        collection, key_field = {"user": (db.users, "username"), "page": (db.pages, "page_name"), "project": (db.projects, "id")}[record_type]
+        if record_type == "user":
+            # Restoring an older backup must not lower a token version, or revoked tokens would validate again
+            usernames = [document["username"] for document in requests]
+            current_versions = {
+                user["username"]: user.get("token_version", 0)
+                async for user in db.users.find({"username": {"$in": usernames}}, {"username": 1, "token_version": 1})
+            }
+            for document in requests:
+                document["token_version"] = max(
+                    document.get("token_version", 0), current_versions.get(document["username"], 0)
+                )
+        await collection.bulk_write(
+            [ReplaceOne({key_field: document[key_field]}, document, upsert=True) for document in requests],
+            ordered=False
+        )
+        if record_type != "user":
+            await record_changes(record_type, [document[key_field] for document in requests])
+    
+    async def add(self, record_type: str, document: dict):
+        self.pending[record_type].append(document)
+        self.counts[record_type] += 1
+        if len(self.pending[record_type]) >= BACKUP_IMPORT_BATCH_SIZE:
+            await self.flush(record_type)
+    
+    async def start_blob(self, record: dict):
+        await self.finish_blob()
+        content_hash = record["hash"]
+        self.blob = {
+            "_id": content_hash,
+            "file_type": record["file_type"],
+            "file_size": record["file_size"],
+            "storage_id": None,
+            "attached": await db.media_blobs.count_documents({"_id": content_hash, "ref_count": {"$gt": 0}}, limit=1) > 0
+        }
+        if not self.blob["attached"]:
+            self.blob["storage_id"] = str(uuid.uuid4())
+            self.grid_in = media_bucket.open_upload_stream_with_id(
+                self.blob["storage_id"], f"import_{content_hash}", metadata={"content_type": record["file_type"]}
+            )
+            self.digest = hashlib.sha256()
+            self.received = 0
+        self.counts["blob"] += 1
+    
+    async def write_chunk(self, record: dict):
+        if self.blob is None or record["hash"] != self.blob["_id"]:
+            raise ValueError("Chunk does not belong to the preceding blob record")
+        if self.grid_in is None:
+            if self.blob["storage_id"] is None:
+                return  # This instance already holds the blob
+            raise ValueError("Chunk arrived after its blob was complete")
+        chunk = base64.b64decode(record["data"])
+        self.digest.update(chunk)
+        self.received += len(chunk)
+        await self.grid_in.write(chunk)
+    
+    async def end_chunks(self):
+        # Called on the first record after a blob's chunks, when its data is complete
+        if self.grid_in is None:
+            return
+        grid_in, self.grid_in = self.grid_in, None
+        if self.digest.hexdigest() != self.blob["_id"] or self.received != self.blob["file_size"]:
+            await grid_in.abort()
+            raise ValueError(f"Data for blob {self.blob['_id']} does not match its hash or size")
+        await grid_in.close()
+    
+    async def finish_blob(self):
+        await self.end_chunks()
+        if self.blob and not self.blob["attached"] and self.blob["storage_id"]:
+            # No imported media ended up using this copy
+            await delete_media_blob(self.blob["storage_id"])
+        self.blob = None
+    
+    async def attach_blob(self, content_hash: str):
+        blob = await db.media_blobs.find_one_and_update(
+            {"_id": content_hash, "ref_count": {"$gt": 0}},
+            {"$inc": {"ref_count": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if blob:
+            return blob
+        if self.blob is None or self.blob["_id"] != content_hash or self.blob["attached"]:
+            raise ValueError(f"Media references blob {content_hash}, which is not in the backup")
+        blob = {
+            "_id": content_hash,
+            "storage_id": self.blob["storage_id"],
+            "file_size": self.blob["file_size"],
+            "file_type": self.blob["file_type"],
+            "ref_count": 1,
+            "created_at": datetime.utcnow()
+        }
+        try:
+            await db.media_blobs.insert_one(blob)
+        except DuplicateKeyError:
+            # The same content arrived through an upload meanwhile; our copy is dropped in finish_blob
+            return await self.attach_blob(content_hash)
+        self.blob["attached"] = True
+        return blob
+    
+    async def add_media(self, data: dict):
+        media_id = data.get("id")
+        if media_id and await db.media.count_documents({"id": media_id}, limit=1):
+            self.counts["media_skipped"] += 1
+            return
+        content_hash = data.get("content_hash")
+        blob = await self.attach_blob(content_hash)
+        try:
+            media = MediaFile(**{**data, "storage_id": blob["storage_id"], "derivatives": blob.get("derivatives") or {}})
+            await db.media.insert_one(media.dict())
+        except Exception:
+            await release_media_blob(content_hash)
+            raise
+        await record_changes("media", [media.id])
+        self.counts["media"] += 1
+    
+    async def apply(self, record: dict):
+        record_type = record.get("type")
+        if record_type != "chunk":
+            await self.end_chunks()
+        if record_type == "header":
+            if record.get("format") != BACKUP_FORMAT or record.get("version") != BACKUP_FORMAT_VERSION:
+                raise ValueError("Unsupported backup format or version")
+        elif record_type == "settings":
+            settings = SiteSettings(**record["data"]).dict()
+            await db.settings.replace_one({}, settings, upsert=True)
+            await record_changes("settings", [settings["id"]])
+            self.counts["settings"] += 1
+        elif record_type in ("user", "page", "project"):
+            model_class = {"user": User, "page": PageContent, "project": Project}[record_type]
+            await self.add(record_type, model_class(**record["data"]).dict())
+        elif record_type == "blob":
+            await self.start_blob(record)
+        elif record_type == "chunk":
+            await self.write_chunk(record)
+        elif record_type == "media":
+            await self.add_media(record["data"])
+        else:
+            raise ValueError(f"Unknown record type '{record_type}'")
+    
+    async def close(self):
+        await self.finish_blob()
+        for record_type in self.pending:
+            await self.flush(record_type)
+    
+    async def abort(self):
+        if self.grid_in is not None:
+            await self.grid_in.abort()
+            self.grid_in = None
+        self.blob = None
+
+async def import_backup(chunks):
+    # Records are applied as they stream in, so memory stays bounded by one batch plus one line
+    importer = BackupImporter()
+    line_number = 0
+    try:
+        async for line in iter_ndjson_lines(chunks):
+            line_number += 1
+            try:
+                record = json.loads(line)
+                if line_number == 1 and record.get("type") != "header":
+                    raise ValueError("Backup must start with a header record")
+                await importer.apply(record)
+            except (ValueError, KeyError, TypeError) as exc:
+                raise ValueError(f"Line {line_number}: {exc}") from exc
+        await importer.close()
+    except BaseException:
+        await importer.abort()
+        raise
+    finally:
+        # Whatever was written before a failure is live, so caches and derived data are refreshed regardless
+        content_cache.clear()
+        principal_cache.clear()
+        await reset_dashboard_counters()
+        await enqueue_job("search.reindex", dedupe_key="search.reindex")
+        await schedule_missing_derivatives()
+    return importer.counts
+
+@api_router.get("/admin/export")
+async def export_site_backup(
+    include_users: bool = True,
+    include_media: bool = True,
+    current_user: User = Depends(get_current_admin_user)
+):
+    filename = f"odon-cms-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.ndjson"
+    return StreamingResponse(
+        export_backup(include_users, include_media),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.post("/admin/import")
+async def import_site_backup(request: Request, current_user: User = Depends(get_current_admin_user)):
+    try:
+        counts = await import_backup(request.stream())
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"message": "Backup imported successfully", "imported": counts}
+
+# Cache Routes
+@api_router.get("/cache/stats")
+async def get_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    return {
+        "content": content_cache.stats(),
+        "principals": principal_cache.stats(),
+        "compression": compression_cache.stats()
+    }
+
+# Dashboard Counters
+DASHBOARD_COUNTERS_ID = "dashboard"
+
+def media_type_key(file_type: Optional[str]):
+    # MIME types such as application/vnd.ms-excel contain dots, which Mongo treats as paths
+    return (file_type or "unknown").replace(".", "_").replace("$", "_")
+
+def published_facet():
+    return [{"$facet": {
+        "total": [{"$count": "count"}],
+        "published": [{"$match": {"is_published": True}}, {"$count": "count"}]
+    }}]
+
+def facet_count(facet: dict, name: str):
+    return facet[name][0]["count"] if facet[name] else 0
+
+async def compute_dashboard_counters():
+    pages, projects, media_types = await asyncio.gather(
+        db.pages.aggregate(published_facet()).to_list(1),
+        db.projects.aggregate(published_facet()).to_list(1),
+        db.media.aggregate([
+            {"$group": {"_id": "$file_type", "count": {"$sum": 1}, "bytes": {"$sum": "$file_size"}}}
+        ]).to_list(None)
+    )
+    media_by_type = {}
+    for entry in media_types:
+        key = media_type_key(entry["_id"])
+        bucket = media_by_type.setdefault(key, {"file_type": entry["_id"] or "unknown", "count": 0, "bytes": 0})
+        bucket["count"] += entry["count"]
+        bucket["bytes"] += entry["bytes"]
+    return {
+        "total_pages": facet_count(pages[0], "total"),
+        "published_pages": facet_count(pages[0], "published"),
+        "total_projects": facet_count(projects[0], "total"),
+        "published_projects": facet_count(projects[0], "published"),
+        "total_media": sum(bucket["count"] for bucket in media_by_type.values()),
+        "total_media_bytes": sum(bucket["bytes"] for bucket in media_by_type.values()),
+        "media_by_type": media_by_type
+    }
+
+async def load_dashboard_counters(refresh: bool = False):
+    if DASHBOARD_COUNTERS_ENABLED and not refresh:
+        counters = await db.stats.find_one({"_id": DASHBOARD_COUNTERS_ID}, {"_id": 0})
+        if counters:
+            return counters
+    # Every counted write records a change, so the change sequence tells us whether one landed while
+    # aggregating; storing the rebuild then would drop or overwrite that write's increment
+    marker = await current_change_seq()
+    counters = await compute_dashboard_counters()
+    if DASHBOARD_COUNTERS_ENABLED and await current_change_seq() == marker:
+        await db.stats.replace_one({"_id": DASHBOARD_COUNTERS_ID}, counters, upsert=True)
+        if await current_change_seq() != marker:
+            # A write slipped in between the check and the replace; the next read rebuilds again
+            await reset_dashboard_counters()
+    return counters
+
+async def adjust_dashboard_counters(media_type: Optional[tuple] = None, **deltas: int):
+    # Call this after the write but before its change is recorded. A rebuild that aggregated the write
+    # then sees the change sequence move and discards its result; recording first would let the rebuild
+    # store counts that already include the write, and this increment would count it twice
+    if not DASHBOARD_COUNTERS_ENABLED:
+        return
+    increments = {field: delta for field, delta in deltas.items() if delta}
+    update = {}
+    if media_type:
+        file_type, count, size = media_type
+        key = media_type_key(file_type)
+        increments[f"media_by_type.{key}.count"] = count
+        increments[f"media_by_type.{key}.bytes"] = size
+        update["$set"] = {f"media_by_type.{key}.file_type": file_type or "unknown"}
+    if not increments:
+        return
+    update["$inc"] = increments
+    # Missing counters are rebuilt on the next dashboard read, so never upsert partial counts
+    await db.stats.update_one({"_id": DASHBOARD_COUNTERS_ID}, update)
+
+async def reset_dashboard_counters():
+    if DASHBOARD_COUNTERS_ENABLED:
+        await db.stats.delete_one({"_id": DASHBOARD_COUNTERS_ID})
+
 # Analytics and Dashboard Routes
 @api_router.get("/dashboard/stats")
-async def get_dashboard_stats(current_user: User = Depends(get_current_admin_user)):
-    total_pages = await db.pages.count_documents({})
-    published_pages = await db.pages.count_documents({"is_published": True})
-    total_projects = await db.projects.count_documents({})
-    published_projects = await db.projects.count_documents({"is_published": True})
-    total_media = await db.media.count_documents({})
+async def get_dashboard_stats(refresh: bool = False, current_user: User = Depends(get_current_admin_user)):
+    counters, recent_pages, recent_projects = await asyncio.gather(
+        load_dashboard_counters(refresh),
+        db.pages.find({}, {"_id": 0, "page_name": 1, "title": 1, "updated_at": 1})
+            .sort("updated_at", DESCENDING).to_list(DASHBOARD_RECENT_LIMIT),
+        db.projects.find({}, {"_id": 0, "id": 1, "title": 1, "updated_at": 1})
+            .sort("updated_at", DESCENDING).to_list(DASHBOARD_RECENT_LIMIT)
+    )
     
     return {
-        "total_pages": total_pages,
-        "published_pages": published_pages,
-        "total_projects": total_projects,
-        "published_projects": published_projects,
-        "total_media": total_media,
+        **counters,
+        "recent_pages": recent_pages,
+        "recent_projects": recent_projects,
         "last_updated": datetime.utcnow()
     }
 
@@ -550,8 +3272,7 @@ async def init_sample_data():
         )
     ]
     
-    for page in sample_pages:
-        await db.pages.insert_one(page.dict())
+    await db.pages.insert_many([page.dict() for page in sample_pages])
     
     # Create sample projects
     sample_projects = [
@@ -585,35 +3306,348 @@ async def init_sample_data():
         )
     ]
     
-    for project in sample_projects:
-        await db.projects.insert_one(project.dict())
+    await db.projects.insert_many([project.dict() for project in sample_projects])
+    await reset_dashboard_counters()
+
+# Database Indexes
+DATABASE_INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+    ],
+    "pages": [
+        IndexModel([("page_name", ASCENDING)], unique=True, name="page_name_unique"),
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("is_published", ASCENDING)], name="is_published"),
+        IndexModel([("updated_at", DESCENDING), ("id", DESCENDING)], name="updated_at_id"),
+    ],
+    "projects": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("order", ASCENDING), ("id", ASCENDING)], name="order_id"),
+        IndexModel([("is_published", ASCENDING), ("order", ASCENDING), ("id", ASCENDING)], name="is_published_order_id"),
+        IndexModel([("updated_at", DESCENDING)], name="updated_at"),
+    ],
+    "changes": [
+        IndexModel([("seq", ASCENDING)], unique=True, name="seq_unique"),
+        IndexModel([("at", ASCENDING)], expireAfterSeconds=CHANGE_LOG_RETENTION_SECONDS, name="at_ttl"),
+    ],
+    "search_index": [
+        IndexModel(
+            [("title", TEXT), ("subtitle", TEXT), ("keywords", TEXT), ("body", TEXT)],
+            weights={"title": 10, "subtitle": 5, "keywords": 5, "body": 1},
+            name="search_text"
+        ),
+    ],
+    "media": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("uploaded_at", DESCENDING), ("id", DESCENDING)], name="uploaded_at_id"),
+        IndexModel([("file_size", DESCENDING), ("id", DESCENDING)], name="file_size_id"),
+        IndexModel([("file_type", ASCENDING), ("id", ASCENDING)], name="file_type_id"),
+        IndexModel([("content_hash", ASCENDING)], name="content_hash"),
+    ],
+    "jobs": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("status", ASCENDING), ("run_at", ASCENDING)], name="status_run_at"),
+        IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)], name="status_lease_expires_at"),
+        IndexModel(
+            [("dedupe_key", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"dedupe_key": {"$type": "string"}, "dedupe_active": True},
+            name="dedupe_key_active"
+        ),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        # Only finished jobs carry finished_at, so queued and running jobs are never expired
+        IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=JOB_RETENTION_SECONDS, name="finished_at_ttl"),
+    ],
+}
+
+async def find_duplicate_keys(collection_name: str, index: IndexModel, limit: int = 10):
+    spec = index.document
+    fields = list(spec["key"])
+    pipeline = [{"$match": spec["partialFilterExpression"]}] if "partialFilterExpression" in spec else []
+    pipeline += [
+        {"$group": {"_id": {field: f"${field}" for field in fields}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    return [group async for group in db[collection_name].aggregate(pipeline)]
+
+async def ensure_indexes():
+    # create_indexes is a no-op for indexes that already exist with the same spec
+    for collection_name, indexes in DATABASE_INDEXES.items():
+        for index in indexes:
+            name = index.document["name"]
+            try:
+                await db[collection_name].create_indexes([index])
+            except OperationFailure as e:
+                if e.code == 85 and "expireAfterSeconds" in index.document:
+                    # The retention setting changed since the TTL index was created; update it in place
+                    await db.command(
+                        "collMod", collection_name,
+                        index={"name": name, "expireAfterSeconds": index.document["expireAfterSeconds"]}
+                    )
+                    logger.info(
+                        f"Updated TTL of index '{name}' on '{collection_name}' to "
+                        f"{index.document['expireAfterSeconds']} seconds"
+                    )
+                    continue
+                if e.code != 11000:
+                    logger.error(f"Could not create index '{name}' on '{collection_name}': {e}")
+                    raise
+                # Existing duplicates block a unique index. Starting without it keeps the site up, but the
+                # uniqueness it guards is not enforced until the duplicates are removed and the app restarted
+                duplicates = await find_duplicate_keys(collection_name, index)
+                logger.error(
+                    f"Skipped unique index '{name}' on '{collection_name}' because documents share a key. "
+                    f"Remove or rename the duplicates, then restart to create the index. Duplicate keys "
+                    f"(up to 10): " + "; ".join(f"{group['_id']} x{group['count']}" for group in duplicates)
+                )
+
+def plan_stages(plan: Any):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from plan_stages(value)
+
+async def verify_query_plans():
+    route_queries = {
+        "get_current_user/login": db.users.find({"username": "admin"}),
+        "get_page": db.pages.find({"page_name": "home"}),
+        "get_pages": db.pages.find().sort([("updated_at", DESCENDING), ("id", DESCENDING)]),
+        "get_published_pages": db.pages.find({"is_published": True}),
+        "get_project": db.projects.find({"id": ""}),
+        "get_projects": db.projects.find().sort([("order", ASCENDING), ("id", ASCENDING)]),
+        "get_published_projects": db.projects.find({"is_published": True}).sort([("order", ASCENDING), ("id", ASCENDING)]),
+        "get_media_file": db.media.find({"id": ""}),
+        "get_media": db.media.find().sort([("uploaded_at", DESCENDING), ("id", DESCENDING)]),
+    }
+    collection_scans = []
+    for route, query in route_queries.items():
+        explanation = await query.explain()
+        stages = set(plan_stages(explanation.get("queryPlanner", {}).get("winningPlan", {})))
+        logger.info(f"Query plan for {route}: {', '.join(sorted(stages))}")
+        if "COLLSCAN" in stages:
+            collection_scans.append(route)
+    if collection_scans:
+        raise RuntimeError(f"Queries fell back to COLLSCAN: {', '.join(collection_scans)}")
+
+# Response Compression
+COMPRESSIBLE_TYPES = {"application/json", "application/javascript", "application/xml", "image/svg+xml", "application/x-ndjson"}
+
+def is_compressible(content_type: str):
+    media_type = content_type.split(";")[0].strip().lower()
+    # Event streams must reach the client as each event is written, so they are left alone
+    if media_type == "text/event-stream":
+        return False
+    return (
+        media_type in COMPRESSIBLE_TYPES
+        or media_type.startswith("text/")
+        or media_type.endswith(("+json", "+xml"))
+    )
+
+def preferred_encoding(accept_encoding: str):
+    if brotli is not None and encoding_accepted(accept_encoding, "br"):
+        return "br"
+    if encoding_accepted(accept_encoding, "gzip"):
+        return "gzip"
+    return None
+
+def compress_body(body: bytes, encoding: str):
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+def streaming_compressor(encoding: str):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    # wbits 31 produces a gzip container
+    compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+async def run_compression(func, data: bytes, *args):
+    # Small payloads compress faster than a thread hop; large ones would stall every other request
+    if len(data) < COMPRESSION_THREAD_MIN_SIZE:
+        return func(data, *args)
+    return await asyncio.get_running_loop().run_in_executor(None, func, data, *args)
+
+compression_cache = TTLCache(COMPRESSION_CACHE_MAX_ENTRIES, CONTENT_CACHE_TTL_SECONDS)
+
+async def cached_compress(body: bytes, encoding: str):
+    # Keyed by content digest, so a cached body is reused exactly as long as the payload is unchanged
+    if len(body) > COMPRESSION_CACHE_MAX_BODY:
+        return await run_compression(compress_body, body, encoding)
+    key = f"{encoding}:{hashlib.blake2b(body, digest_size=16).hexdigest()}"
+    found, compressed = compression_cache.get(key)
+    if not found:
+        generation = compression_cache.generation
+        compressed = await run_compression(compress_body, body, encoding)
+        compression_cache.set(key, compressed, generation)
+    return compressed
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = preferred_encoding(request_headers.get("accept-encoding", ""))
+        # Byte ranges refer to the identity encoding, so they are never compressed
+        if encoding is None or "range" in request_headers:
+            await self.app(scope, receive, send)
+            return
+        
+        start_message = None
+        compress_chunk = finish = None
+        
+        async def send_wrapper(message):
+            nonlocal start_message, compress_chunk, finish
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                eligible = (
+                    start_message["status"] in (200, 201)
+                    and "content-encoding" not in headers
+                    and is_compressible(headers.get("content-type", ""))
+                    and (more_body or len(body) >= self.minimum_size)
+                )
+                if not eligible:
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    compress_chunk = None
+                    return
+                
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # The compressed representation is no longer byte-identical to the strong validator
+                    headers["ETag"] = f"W/{etag}"
+                
+                if not more_body:
+                    body = await cached_compress(body, encoding)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    start_message = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                
+                del headers["Content-Length"]
+                compress_chunk, finish = streaming_compressor(encoding)
+                await send(start_message)
+                start_message = None
+            
+            if compress_chunk is None:
+                await send(message)
+                return
+            # Chunks are compressed one at a time, so the compressor is never used from two threads at once
+            chunk = await run_compression(compress_chunk, body)
+            if not more_body:
+                chunk += finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+        
+        await self.app(scope, receive, send_wrapper)
+
+# Request Metrics
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status_code = 500
+        response_size = 0
+        
+        async def send_wrapper(message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+        
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            # Label by route template rather than raw path to keep cardinality bounded
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(method, route_label, str(status_code)).observe(time.perf_counter() - started_at)
+            HTTP_RESPONSE_SIZE.labels(method, route_label).observe(response_size)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    if METRICS_TOKEN and (credentials is None or credentials.credentials != METRICS_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 @app.on_event("startup")
 async def startup_event():
+    await ensure_indexes()
+    if VERIFY_QUERY_PLANS:
+        await verify_query_plans()
     await init_default_admin()
     await init_sample_data()
+    await ensure_search_index()
+    await migrate_base64_media()
+    await reconcile_media_blobs()
+    await schedule_missing_derivatives()
+    start_job_workers()
+    if STATIC_EXPORT_DIR:
+        written = await export_static_site(Path(STATIC_EXPORT_DIR))
+        logger.info(f"Static export wrote {written} files to {STATIC_EXPORT_DIR}")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await stop_job_workers()
     client.close()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+    password_executor.shutdown(wait=False)
+    media_executor.shutdown(wait=False)
 
 if __name__ == "__main__":
     import uvicorn
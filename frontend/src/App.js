@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { BrowserRouter as Router, Routes, Route, Link, useNavigate, useLocation } from 'react-router-dom';
 import axios from 'axios';
 import './App.css';
@@ -1225,6 +1225,7 @@ const App = () => {
   const [isAdminPanelOpen, setIsAdminPanelOpen] = useState(false);
   const [editingPage, setEditingPage] = useState(null);
   const [editingProject, setEditingProject] = useState(null);
+  const changesCursor = useRef(null);
 
   useEffect(() => {
     loadContent();
@@ -1236,6 +1237,19 @@ const App = () => {
   const loadContent = async () => {
     try {
       setLoading(true);
+
+      // Take the change feed cursor before the full load so no edit falls in between
+      changesCursor.current = null;
+      if (token) {
+        try {
+          const changesResponse = await axios.get(`${API}/changes`, {
+            headers: { Authorization: `Bearer ${token}` }
+          });
+          changesCursor.current = changesResponse.data.cursor;
+        } catch (error) {
+          changesCursor.current = null;
+        }
+      }
       
       const [pagesResponse, projectsResponse] = await Promise.all([
         axios.get(`${API}/pages`),
@@ -1256,6 +1270,53 @@ const App = () => {
     }
   };
 
+  const syncChanges = async () => {
+    if (!token || changesCursor.current === null) {
+      await loadContent();
+      return;
+    }
+
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const response = await axios.get(`${API}/changes`, {
+          params: { since: changesCursor.current },
+          headers: { Authorization: `Bearer ${token}` }
+        });
+        const delta = response.data;
+        if (delta.reset) {
+          await loadContent();
+          return;
+        }
+
+        setPages(previousPages => {
+          const nextPages = { ...previousPages };
+          delta.deleted.pages.forEach(pageName => {
+            delete nextPages[pageName];
+          });
+          delta.pages.forEach(page => {
+            nextPages[page.page_name] = page;
+          });
+          return nextPages;
+        });
+        setProjects(previousProjects => {
+          const deletedIds = new Set(delta.deleted.projects);
+          const changedIds = new Set(delta.projects.map(project => project.id));
+          return previousProjects
+            .filter(project => !deletedIds.has(project.id) && !changedIds.has(project.id))
+            .concat(delta.projects)
+            .sort((a, b) => a.order - b.order);
+        });
+
+        changesCursor.current = delta.cursor;
+        hasMore = delta.has_more;
+      }
+    } catch (error) {
+      console.error('Error syncing changes:', error);
+      await loadContent();
+    }
+  };
+
   const verifyToken = async () => {
     try {
       const response = await axios.get(`${API}/auth/me`, {
@@ -1296,7 +1357,7 @@ const App = () => {
         await axios.delete(`${API}/projects/${projectId}`, {
           headers: { Authorization: `Bearer ${token}` }
         });
-        await loadContent();
+        await syncChanges();
       } catch (error) {
         console.error('Error deleting project:', error);
         alert('Failed to delete project');
@@ -1311,7 +1372,7 @@ const App = () => {
         await axios.delete(`${API}/pages/${page.page_name}`, {
           headers: { Authorization: `Bearer ${token}` }
         });
-        await loadContent();
+        await syncChanges();
       } catch (error) {
         console.error('Error deleting page:', error);
         alert('Failed to delete page');
@@ -1325,7 +1386,7 @@ const App = () => {
       await axios.put(`${API}/pages/${page.page_name}`, { is_published: newStatus }, {
         headers: { Authorization: `Bearer ${token}` }
       });
-      await loadContent();
+      await syncChanges();
     } catch (error) {
       console.error('Error updating page status:', error);
       alert('Failed to update page status');
@@ -1458,7 +1519,7 @@ const App = () => {
           onEditProject={handleEditProject}
           onAddProject={() => handleEditProject()}
           onDeleteProject={handleDeleteProject}
-          onCreatePage={loadContent}
+          onCreatePage={syncChanges}
           onDeletePage={handleDeletePage}
           onTogglePageStatus={handleTogglePageStatus}
           token={token}
@@ -1469,7 +1530,7 @@ const App = () => {
           page={editingPage}
           isOpen={!!editingPage}
           onClose={() => setEditingPage(null)}
-          onSave={loadContent}
+          onSave={syncChanges}
           token={token}
         />
 
@@ -1478,7 +1539,7 @@ const App = () => {
           project={editingProject}
           isOpen={!!editingProject}
           onClose={() => setEditingProject(null)}
-          onSave={loadContent}
+          onSave={syncChanges}
           token={token}
         />
       </div>
@@ -0,0 +1,588 @@
+"""Endpoint benchmark and load test for the CMS API.
+
+Seeds a synthetic dataset into a scratch database, drives every route on
+``api_router`` concurrently through the full middleware stack and reports
+p50/p95/p99 latency, throughput and peak RSS per route. The run fails when a
+route regresses past the stored baselines by more than the tolerance, and when
+no baselines are stored unless --no-baselines is passed.
+
+    MONGO_URL=mongodb://localhost:27017 python tests/benchmark.py
+    python tests/benchmark.py --pages 2000 --page-kb 128 --concurrency 32
+    python tests/benchmark.py --update-baselines
+    python tests/benchmark.py --no-baselines --only pages
+
+The app runs in-process through httpx's ASGI transport, so numbers exclude
+socket overhead but include middleware, serialization and MongoDB round trips.
+It needs a real mongod: GridFS, $text search and pipeline updates are not
+covered by in-memory Motor stand-ins.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+BASELINES_PATH = Path(__file__).resolve().parent / "benchmark_baselines.json"
+
+# Streaming responses never complete, so they cannot be timed request by request
+SKIPPED_ROUTES = {"/api/changes/stream"}
+
+WORDS = (
+    "lab research data model sample field analysis sensor water soil climate "
+    "network signal pattern study result method survey report archive image"
+).split()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark every API route against stored baselines")
+    parser.add_argument("--pages", type=int, default=200, help="Synthetic pages to seed")
+    parser.add_argument("--page-kb", type=int, default=32, help="Approximate size of each page's content")
+    parser.add_argument("--projects", type=int, default=100, help="Synthetic projects to seed")
+    parser.add_argument("--media", type=int, default=24, help="Synthetic media files to seed")
+    parser.add_argument("--media-kb", type=str, default="4,256,2048", help="Comma separated media sizes to cycle through")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per read route")
+    parser.add_argument("--write-requests", type=int, default=50, help="Requests per write route")
+    parser.add_argument("--auth-requests", type=int, default=10, help="Requests per password hashing route")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients per route")
+    parser.add_argument("--only", type=str, default=None, help="Only run scenarios whose name contains this string")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the synthetic dataset")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression as a fraction of the baseline")
+    parser.add_argument("--baselines", type=Path, default=BASELINES_PATH)
+    parser.add_argument("--update-baselines", action="store_true", help="Store this run as the new baselines")
+    parser.add_argument("--no-baselines", action="store_true", help="Only report results; skip the baseline comparison")
+    parser.add_argument("--output", type=Path, default=None, help="Write the full results as JSON")
+    parser.add_argument("--db-name", type=str, default="odon_benchmark", help="Scratch database, dropped before and after the run")
+    parser.add_argument("--keep-data", action="store_true", help="Leave the scratch database in place")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    # Must run before the server module is imported since it reads its config at import time
+    os.environ["DB_NAME"] = args.db_name
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("AUTH_RATE_LIMIT_BURST", "1000000")
+    os.environ.setdefault("AUTH_RATE_LIMIT_PER_SECOND", "1000000")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(sorted_values: List[float], fraction: float):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def make_text(rng: random.Random, size: int):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def make_page_content(rng: random.Random, size: int):
+    section_size = max(256, size // 8)
+    return {
+        "body": make_text(rng, size // 2),
+        "sections": [
+            {"heading": make_text(rng, 32), "text": make_text(rng, section_size)}
+            for _ in range(4)
+        ],
+    }
+
+
+def make_png(rng: random.Random, size_kb: int, Image):
+    # Noise does not compress, so the side length tracks the requested size
+    side = max(16, int((size_kb * 1024 / 3) ** 0.5))
+    image = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+@dataclass
+class Context:
+    http: Any
+    rng: random.Random
+    admin_headers: Dict[str, str]
+    page_names: List[str] = field(default_factory=list)
+    project_ids: List[str] = field(default_factory=list)
+    media_ids: List[str] = field(default_factory=list)
+    image_ids: List[str] = field(default_factory=list)
+    media_etags: Dict[str, str] = field(default_factory=dict)
+    job_ids: List[str] = field(default_factory=list)
+    bench_username: str = "bench-user"
+
+    def unique(self, prefix: str):
+        return f"{prefix}-{uuid.uuid4().hex[:12]}"
+
+
+Prepare = Callable[[Context, int], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    route: str
+    prepare: Prepare
+    kind: str = "read"  # read, write or auth; picks the request count
+    concurrency: Optional[int] = None
+    expect: Tuple[int, ...] = (200,)
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    method: str
+    route: str
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    throughput_rps: float
+    peak_rss_mb: float
+
+
+async def seed_dataset(server, args, rng: random.Random):
+    now = server.datetime.utcnow()
+    pages = [
+        server.PageContent(
+            page_name=f"bench-page-{index}",
+            title=make_text(rng, 48),
+            subtitle=make_text(rng, 96),
+            content=make_page_content(rng, args.page_kb * 1024),
+            is_published=index % 5 != 0,
+            created_at=now,
+            updated_at=now,
+        ).dict()
+        for index in range(args.pages)
+    ]
+    projects = [
+        server.Project(
+            title=make_text(rng, 48),
+            description=make_text(rng, 1024),
+            key_areas=make_text(rng, 128),
+            icon="flask",
+            order=index + 1,
+            is_published=index % 4 != 0,
+            created_at=now,
+            updated_at=now,
+        ).dict()
+        for index in range(args.projects)
+    ]
+    if pages:
+        await server.db.pages.insert_many(pages)
+    if projects:
+        await server.db.projects.insert_many(projects)
+    await server.rebuild_search_index()
+    await server.reset_dashboard_counters()
+    server.content_cache.clear()
+    return [page["page_name"] for page in pages], [project["id"] for project in projects]
+
+
+async def upload_media(ctx: Context, server, size_kb: int, as_image: bool):
+    if as_image and server.Image is not None:
+        name, body, content_type = f"{ctx.unique('bench')}.png", make_png(ctx.rng, size_kb, server.Image), "image/png"
+    else:
+        name, body, content_type = f"{ctx.unique('bench')}.bin", ctx.rng.randbytes(size_kb * 1024), "application/octet-stream"
+    response = await ctx.http.post(
+        "/api/media/upload",
+        files={"file": (name, body, content_type)},
+        headers=ctx.admin_headers,
+    )
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def seed_jobs(server, count: int = 50):
+    async def noop():
+        return None
+    server.JOB_HANDLERS["benchmark.noop"] = noop
+    jobs = [
+        server.Job(type="benchmark.noop", status="succeeded", attempts=1, finished_at=server.datetime.utcnow()).dict()
+        for _ in range(count)
+    ]
+    await server.db.jobs.insert_many(jobs)
+    return [job["id"] for job in jobs]
+
+
+async def seed_media(ctx: Context, server, args):
+    sizes = [int(size) for size in args.media_kb.split(",") if size.strip()]
+    for index in range(args.media):
+        as_image = index % 2 == 0
+        media_id = await upload_media(ctx, server, sizes[index % len(sizes)], as_image)
+        ctx.media_ids.append(media_id)
+        if as_image and server.Image is not None:
+            ctx.image_ids.append(media_id)
+    for media_id in ctx.media_ids:
+        response = await ctx.http.get(f"/api/media/{media_id}", headers={"Range": "bytes=0-0"})
+        ctx.media_etags[media_id] = response.headers.get("ETag", "")
+
+
+def build_scenarios(server) -> List[Scenario]:
+    def static(url: str, auth: bool = False, **kwargs):
+        async def prepare(ctx: Context, index: int):
+            return {"url": url, "headers": ctx.admin_headers if auth else {}, **kwargs}
+        return prepare
+
+    async def register(ctx, index):
+        username = ctx.unique("bench-register")
+        return {"url": "/api/auth/register", "json": {"username": username, "email": f"{username}@example.com", "password": "bench-password"}}
+
+    async def login(ctx, index):
+        return {"url": "/api/auth/login", "json": {"username": "admin", "password": "admin123"}}
+
+    async def revoke(ctx, index):
+        # Each revoke bumps the version, so tokens are minted ahead for the sequence of calls
+        user = await server.db.users.find_one({"username": ctx.bench_username})
+        token = server.create_access_token({"sub": ctx.bench_username, "ver": user.get("token_version", 0) + index})
+        return {"url": "/api/auth/revoke", "headers": {"Authorization": f"Bearer {token}"}}
+
+    async def update_user(ctx, index):
+        return {"url": f"/api/users/{ctx.bench_username}", "json": {"is_active": True}, "headers": ctx.admin_headers}
+
+    async def get_page(ctx, index):
+        return {"url": f"/api/pages/{ctx.page_names[index % len(ctx.page_names)]}"}
+
+    async def create_page(ctx, index):
+        data = {"page_name": ctx.unique("bench-created"), "title": make_text(ctx.rng, 48), "content": make_page_content(ctx.rng, 4096)}
+        return {"url": "/api/pages", "json": data, "headers": ctx.admin_headers}
+
+    async def bulk_pages(ctx, index):
+        operations = [
+            {"action": "create", "data": {"page_name": ctx.unique("bench-bulk"), "title": make_text(ctx.rng, 48)}}
+            for _ in range(10)
+        ] + [
+            {"action": "update", "key": ctx.rng.choice(ctx.page_names), "data": {"subtitle": make_text(ctx.rng, 96)}}
+            for _ in range(10)
+        ]
+        return {"url": "/api/pages/bulk", "json": {"operations": operations, "ordered": False}, "headers": ctx.admin_headers}
+
+    async def update_page(ctx, index):
+        page_name = ctx.page_names[index % len(ctx.page_names)]
+        return {"url": f"/api/pages/{page_name}", "json": {"subtitle": make_text(ctx.rng, 96)}, "headers": ctx.admin_headers}
+
+    async def patch_page_content(ctx, index):
+        page_name = ctx.page_names[index % len(ctx.page_names)]
+        operations = [{"op": "replace", "path": "/body", "value": make_text(ctx.rng, 512)}]
+        return {"url": f"/api/pages/{page_name}/content", "json": operations, "headers": ctx.admin_headers}
+
+    async def toggle_page(ctx, index):
+        return {"url": f"/api/pages/{ctx.page_names[index % len(ctx.page_names)]}/toggle-status", "headers": ctx.admin_headers}
+
+    async def delete_page(ctx, index):
+        page_name = ctx.unique("bench-delete")
+        response = await ctx.http.post("/api/pages", json={"page_name": page_name, "title": "Delete me"}, headers=ctx.admin_headers)
+        response.raise_for_status()
+        return {"url": f"/api/pages/{page_name}", "headers": ctx.admin_headers}
+
+    async def get_project(ctx, index):
+        return {"url": f"/api/projects/{ctx.project_ids[index % len(ctx.project_ids)]}"}
+
+    def project_data(ctx: Context):
+        return {"title": make_text(ctx.rng, 48), "description": make_text(ctx.rng, 512), "key_areas": make_text(ctx.rng, 64), "icon": "flask"}
+
+    async def create_project(ctx, index):
+        return {"url": "/api/projects", "json": project_data(ctx), "headers": ctx.admin_headers}
+
+    async def bulk_projects(ctx, index):
+        operations = [{"action": "create", "data": project_data(ctx)} for _ in range(10)] + [
+            {"action": "update", "key": ctx.rng.choice(ctx.project_ids), "data": {"key_areas": make_text(ctx.rng, 64)}}
+            for _ in range(10)
+        ]
+        return {"url": "/api/projects/bulk", "json": {"operations": operations, "ordered": False}, "headers": ctx.admin_headers}
+
+    async def reorder_projects(ctx, index):
+        project_ids = list(ctx.project_ids)
+        ctx.rng.shuffle(project_ids)
+        return {"url": "/api/projects/reorder", "json": {"project_ids": project_ids}, "headers": ctx.admin_headers}
+
+    async def update_project(ctx, index):
+        project_id = ctx.project_ids[index % len(ctx.project_ids)]
+        return {"url": f"/api/projects/{project_id}", "json": {"description": make_text(ctx.rng, 512)}, "headers": ctx.admin_headers}
+
+    async def toggle_project(ctx, index):
+        return {"url": f"/api/projects/{ctx.project_ids[index % len(ctx.project_ids)]}/toggle-status", "headers": ctx.admin_headers}
+
+    async def delete_project(ctx, index):
+        response = await ctx.http.post("/api/projects", json=project_data(ctx), headers=ctx.admin_headers)
+        response.raise_for_status()
+        return {"url": f"/api/projects/{response.json()['id']}", "headers": ctx.admin_headers}
+
+    async def update_settings(ctx, index):
+        return {"url": "/api/settings", "json": {"site_description": make_text(ctx.rng, 128)}, "headers": ctx.admin_headers}
+
+    async def search(ctx, index):
+        return {"url": "/api/search", "params": {"q": " ".join(ctx.rng.sample(WORDS, 2))}}
+
+    async def upload(ctx, index):
+        name = f"{ctx.unique('bench-upload')}.bin"
+        return {"url": "/api/media/upload", "files": {"file": (name, ctx.rng.randbytes(64 * 1024), "application/octet-stream")}, "headers": ctx.admin_headers}
+
+    async def get_media(ctx, index):
+        return {"url": f"/api/media/{ctx.media_ids[index % len(ctx.media_ids)]}"}
+
+    async def get_media_range(ctx, index):
+        return {"url": f"/api/media/{ctx.media_ids[index % len(ctx.media_ids)]}", "headers": {"Range": "bytes=0-65535"}}
+
+    async def get_media_not_modified(ctx, index):
+        media_id = ctx.media_ids[index % len(ctx.media_ids)]
+        return {"url": f"/api/media/{media_id}", "headers": {"If-None-Match": ctx.media_etags[media_id]}}
+
+    async def get_media_thumbnail(ctx, index):
+        media_ids = ctx.image_ids or ctx.media_ids
+        return {"url": f"/api/media/{media_ids[index % len(media_ids)]}", "params": {"size": "thumbnail", "format": "webp"}}
+
+    async def delete_media(ctx, index):
+        media_id = await upload_media(ctx, server, 16, as_image=False)
+        return {"url": f"/api/media/{media_id}", "headers": ctx.admin_headers}
+
+    async def get_job(ctx, index):
+        return {"url": f"/api/jobs/{ctx.job_ids[index % len(ctx.job_ids)]}", "headers": ctx.admin_headers}
+
+    async def retry_job(ctx, index):
+        job = server.Job(type="benchmark.noop", status="failed", attempts=1, finished_at=server.datetime.utcnow())
+        await server.db.jobs.insert_one(job.dict())
+        return {"url": f"/api/jobs/{job.id}/retry", "headers": ctx.admin_headers}
+
+    async def import_backup(ctx, index):
+        # Re-imports the content without media or users, which upserts every page and project
+        response = await ctx.http.get("/api/admin/export", params={"include_media": False, "include_users": False}, headers=ctx.admin_headers)
+        response.raise_for_status()
+        return {"url": "/api/admin/import", "content": response.content, "headers": ctx.admin_headers}
+
+    async def get_changes(ctx, index):
+        return {"url": "/api/changes", "params": {"since": 0}, "headers": ctx.admin_headers}
+
+    compressed = {"Accept-Encoding": "br, gzip"}
+    return [
+        Scenario("auth.register", "POST", "/api/auth/register", register, kind="auth"),
+        Scenario("auth.login", "POST", "/api/auth/login", login, kind="auth"),
+        Scenario("auth.me", "GET", "/api/auth/me", static("/api/auth/me", auth=True)),
+        Scenario("auth.revoke", "POST", "/api/auth/revoke", revoke, kind="write", concurrency=1),
+        Scenario("users.update", "PATCH", "/api/users/{username}", update_user, kind="write"),
+        Scenario("pages.list", "GET", "/api/pages", static("/api/pages", params={"limit": 100})),
+        Scenario("pages.list_fields", "GET", "/api/pages", static("/api/pages", params={"limit": 100, "fields": "page_name,title"})),
+        Scenario("pages.published", "GET", "/api/pages/published", static("/api/pages/published", headers=compressed)),
+        Scenario("pages.get", "GET", "/api/pages/{page_name}", get_page),
+        Scenario("pages.create", "POST", "/api/pages", create_page, kind="write"),
+        Scenario("pages.bulk", "POST", "/api/pages/bulk", bulk_pages, kind="write"),
+        Scenario("pages.update", "PUT", "/api/pages/{page_name}", update_page, kind="write"),
+        Scenario("pages.patch_content", "PATCH", "/api/pages/{page_name}/content", patch_page_content, kind="write"),
+        Scenario("pages.toggle", "PATCH", "/api/pages/{page_name}/toggle-status", toggle_page, kind="write"),
+        Scenario("pages.delete", "DELETE", "/api/pages/{page_name}", delete_page, kind="write"),
+        Scenario("projects.list", "GET", "/api/projects", static("/api/projects", params={"limit": 100})),
+        Scenario("projects.published", "GET", "/api/projects/published", static("/api/projects/published")),
+        Scenario("projects.get", "GET", "/api/projects/{project_id}", get_project),
+        Scenario("projects.create", "POST", "/api/projects", create_project, kind="write"),
+        Scenario("projects.bulk", "POST", "/api/projects/bulk", bulk_projects, kind="write"),
+        Scenario("projects.reorder", "POST", "/api/projects/reorder", reorder_projects, kind="write"),
+        Scenario("projects.update", "PUT", "/api/projects/{project_id}", update_project, kind="write"),
+        Scenario("projects.toggle", "PATCH", "/api/projects/{project_id}/toggle-status", toggle_project, kind="write"),
+        Scenario("projects.delete", "DELETE", "/api/projects/{project_id}", delete_project, kind="write"),
+        Scenario("settings.get", "GET", "/api/settings", static("/api/settings")),
+        Scenario("settings.update", "PUT", "/api/settings", update_settings, kind="write"),
+        Scenario("site.snapshot", "GET", "/api/site", static("/api/site", headers=compressed)),
+        Scenario("search.query", "GET", "/api/search", search),
+        Scenario("search.reindex", "POST", "/api/search/reindex", static("/api/search/reindex", auth=True), kind="auth", concurrency=1),
+        Scenario("media.upload", "POST", "/api/media/upload", upload, kind="write"),
+        Scenario("media.list", "GET", "/api/media", static("/api/media", auth=True)),
+        Scenario("media.get", "GET", "/api/media/{media_id}", get_media),
+        Scenario("media.get_range", "GET", "/api/media/{media_id}", get_media_range, expect=(206,)),
+        Scenario("media.get_not_modified", "GET", "/api/media/{media_id}", get_media_not_modified, expect=(304,)),
+        Scenario("media.get_thumbnail", "GET", "/api/media/{media_id}", get_media_thumbnail),
+        Scenario("media.delete", "DELETE", "/api/media/{media_id}", delete_media, kind="write"),
+        Scenario("jobs.list", "GET", "/api/jobs", static("/api/jobs", auth=True)),
+        Scenario("jobs.get", "GET", "/api/jobs/{job_id}", get_job),
+        Scenario("jobs.retry", "POST", "/api/jobs/{job_id}/retry", retry_job, kind="write"),
+        Scenario("admin.export", "GET", "/api/admin/export", static("/api/admin/export", auth=True), kind="auth", concurrency=1),
+        Scenario("admin.import", "POST", "/api/admin/import", import_backup, kind="auth", concurrency=1),
+        Scenario("changes.since", "GET", "/api/changes", get_changes),
+        Scenario("cache.stats", "GET", "/api/cache/stats", static("/api/cache/stats", auth=True)),
+        Scenario("dashboard.stats", "GET", "/api/dashboard/stats", static("/api/dashboard/stats", auth=True)),
+    ]
+
+
+def uncovered_routes(server, scenarios: List[Scenario]):
+    covered = {(scenario.method, scenario.route) for scenario in scenarios}
+    missing = []
+    for route in server.api_router.routes:
+        if route.path in SKIPPED_ROUTES:
+            continue
+        for method in sorted(route.methods):
+            if (method, route.path) not in covered:
+                missing.append(f"{method} {route.path}")
+    return missing
+
+
+async def run_scenario(ctx: Context, scenario: Scenario, total: int, concurrency: int):
+    # Requests are prepared up front so fixture setup never counts towards the timings
+    prepared = [await scenario.prepare(ctx, index) for index in range(total)]
+    latencies = []
+    errors = 0
+    pending = iter(prepared)
+
+    async def client():
+        nonlocal errors
+        for kwargs in pending:
+            url = kwargs.pop("url")
+            started_at = time.perf_counter()
+            response = await ctx.http.request(scenario.method, url, **kwargs)
+            latencies.append(time.perf_counter() - started_at)
+            if response.status_code not in scenario.expect:
+                errors += 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(max(1, min(concurrency, total)))))
+    elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    return ScenarioResult(
+        name=scenario.name,
+        method=scenario.method,
+        route=scenario.route,
+        requests=total,
+        errors=errors,
+        p50_ms=percentile(latencies, 0.50) * 1000,
+        p95_ms=percentile(latencies, 0.95) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        throughput_rps=total / elapsed if elapsed else 0.0,
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+def compare_with_baselines(results: List[ScenarioResult], baselines: dict, tolerance: float):
+    regressions = []
+    for result in results:
+        baseline = baselines.get("scenarios", {}).get(result.name)
+        if not baseline:
+            continue
+        if result.p95_ms > baseline["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{result.name}: p95 {result.p95_ms:.1f} ms > baseline {baseline['p95_ms']:.1f} ms")
+        if result.throughput_rps < baseline["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{result.name}: {result.throughput_rps:.1f} req/s < baseline {baseline['throughput_rps']:.1f} req/s")
+    peak = max((result.peak_rss_mb for result in results), default=0.0)
+    baseline_peak = baselines.get("peak_rss_mb")
+    if baseline_peak and peak > baseline_peak * (1 + tolerance):
+        regressions.append(f"peak RSS {peak:.1f} MB > baseline {baseline_peak:.1f} MB")
+    return regressions
+
+
+def print_results(results: List[ScenarioResult]):
+    print(f"{'scenario':<28}{'reqs':>6}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'rss MB':>9}")
+    for result in results:
+        print(
+            f"{result.name:<28}{result.requests:>6}{result.errors:>8}{result.p50_ms:>10.2f}{result.p95_ms:>10.2f}"
+            f"{result.p99_ms:>10.2f}{result.throughput_rps:>10.1f}{result.peak_rss_mb:>9.1f}"
+        )
+
+
+async def run(args):
+    configure_environment(args)
+    import httpx
+    import server
+
+    await server.client.drop_database(args.db_name)
+    await server.startup_event()
+    rng = random.Random(args.seed)
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as http:
+        response = await http.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+        response.raise_for_status()
+        ctx = Context(http=http, rng=rng, admin_headers={"Authorization": f"Bearer {response.json()['access_token']}"})
+        response = await http.post(
+            "/api/auth/register",
+            json={"username": ctx.bench_username, "email": "bench-user@example.com", "password": "bench-password"}
+        )
+        response.raise_for_status()
+
+        print(f"Seeding {args.pages} pages, {args.projects} projects and {args.media} media files into '{args.db_name}'")
+        ctx.page_names, ctx.project_ids = await seed_dataset(server, args, rng)
+        await seed_media(ctx, server, args)
+        ctx.job_ids = await seed_jobs(server)
+
+        scenarios = build_scenarios(server)
+        missing = uncovered_routes(server, scenarios)
+        if args.only:
+            scenarios = [scenario for scenario in scenarios if args.only in scenario.name]
+        counts = {"read": args.requests, "write": args.write_requests, "auth": args.auth_requests}
+        results = []
+        for scenario in scenarios:
+            total = counts[scenario.kind]
+            result = await run_scenario(ctx, scenario, total, scenario.concurrency or args.concurrency)
+            results.append(result)
+            print(f"  {scenario.name}: p95 {result.p95_ms:.1f} ms, {result.throughput_rps:.1f} req/s")
+
+    # Let derivative jobs scheduled by the uploads finish before the database goes away
+    while await server.db.jobs.count_documents({"type": "media.derivatives", "status": {"$in": ["queued", "running"]}}):
+        await asyncio.sleep(0.5)
+    if not args.keep_data:
+        await server.client.drop_database(args.db_name)
+    await server.shutdown_db_client()
+    return results, missing
+
+
+def main():
+    args = parse_args()
+    results, missing = asyncio.run(run(args))
+    print()
+    print_results(results)
+
+    report = {
+        "dataset": {"pages": args.pages, "page_kb": args.page_kb, "projects": args.projects, "media": args.media, "media_kb": args.media_kb},
+        "concurrency": args.concurrency,
+        "peak_rss_mb": max((result.peak_rss_mb for result in results), default=0.0),
+        "scenarios": {result.name: result.__dict__ for result in results},
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    failures = []
+    if missing:
+        failures.append("Routes without a benchmark scenario: " + ", ".join(missing))
+    failures.extend(f"{result.name}: {result.errors} unexpected responses" for result in results if result.errors)
+
+    if args.update_baselines:
+        args.baselines.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nBaselines written to {args.baselines}")
+    elif args.no_baselines:
+        print("\nBaseline comparison skipped")
+    elif args.baselines.exists():
+        baselines = json.loads(args.baselines.read_text())
+        if baselines.get("dataset") != report["dataset"] or baselines.get("concurrency") != args.concurrency:
+            print("\nWarning: baselines were recorded with a different dataset or concurrency")
+        failures.extend(compare_with_baselines(results, baselines, args.tolerance))
+    else:
+        # Without stored baselines a regression could never fail the run, so a missing file is an error
+        failures.append(f"No baselines at {args.baselines}; record them with --update-baselines or pass --no-baselines")
+
+    if failures:
+        print("\nFAILED")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
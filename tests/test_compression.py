@@ -0,0 +1,22 @@
+import pytest
+
+import server
+
+
+@pytest.mark.parametrize("accept_encoding, encoding, accepted", [
+    ("gzip", "gzip", True),
+    ("br, gzip", "br", True),
+    ("deflate", "gzip", False),
+    ("", "gzip", False),
+    ("gzip;q=0", "gzip", False),
+    ("gzip;q=0.5", "gzip", True),
+    ("gzip;q=bad", "gzip", False),
+    ("*", "br", True),
+    ("*;q=0", "gzip", False),
+    ("*;q=0, gzip", "gzip", True),
+    ("gzip, *;q=0", "gzip", True),
+    ("*, gzip;q=0", "gzip", False),
+    ("*;q=0, gzip", "br", False),
+])
+def test_encoding_accepted(accept_encoding, encoding, accepted):
+    assert server.encoding_accepted(accept_encoding, encoding) is accepted
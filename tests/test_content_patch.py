@@ -0,0 +1,212 @@
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def apply_patch(content: dict, *operations: dict):
+    patch = server.ContentPatch(content)
+    for operation in operations:
+        patch.apply(server.JSONPatchOperation.model_validate(operation))
+    return patch
+
+
+def compiled(content: dict, *operations: dict):
+    return apply_patch(content, *operations).compile()
+
+
+def assert_rejected(status_code: int, content: dict, *operations: dict):
+    with pytest.raises(HTTPException) as excinfo:
+        apply_patch(content, *operations)
+    assert excinfo.value.status_code == status_code
+
+
+def test_parse_json_pointer_unescapes_segments():
+    assert server.parse_json_pointer("") == []
+    assert server.parse_json_pointer("/a~1b/c~0d/0") == ["a/b", "c~d", "0"]
+
+
+def test_add_object_member():
+    patch = apply_patch({"a": {"x": 1}}, {"op": "add", "path": "/a/y", "value": 2})
+    assert patch.compile() == ({"$set": {"content.a.y": 2}}, {"content.a": {"$type": "object"}})
+    assert patch.content == {"a": {"x": 1, "y": 2}}
+
+
+def test_add_top_level_member_needs_no_guard():
+    assert compiled({}, {"op": "add", "path": "/title", "value": "New"}) == ({"$set": {"content.title": "New"}}, {})
+
+
+def test_add_appends_to_array():
+    assert compiled({"list": [1, 2]}, {"op": "add", "path": "/list/-", "value": 3}) == (
+        {"$push": {"content.list": {"$each": [3]}}},
+        {"content.list": {"$type": "array"}},
+    )
+
+
+def test_add_inserts_into_array_at_position():
+    patch = apply_patch({"list": [1, 2]}, {"op": "add", "path": "/list/1", "value": 9})
+    assert patch.compile() == (
+        {"$push": {"content.list": {"$each": [9], "$position": 1}}},
+        {"content.list": {"$type": "array"}, "content.list.0": {"$exists": True}},
+    )
+    assert patch.content == {"list": [1, 9, 2]}
+
+
+def test_remove_object_member():
+    assert compiled({"a": {"x": 1}}, {"op": "remove", "path": "/a/x"}) == (
+        {"$unset": {"content.a.x": ""}},
+        {"content.a.x": {"$exists": True}},
+    )
+
+
+def test_remove_array_element_rewrites_array_guarded_by_stored_value():
+    assert compiled({"list": [1, 2]}, {"op": "remove", "path": "/list/0"}) == (
+        {"$set": {"content.list": [2]}},
+        {"content.list": [1, 2]},
+    )
+
+
+def test_replace_object_member():
+    assert compiled({"title": "Old"}, {"op": "replace", "path": "/title", "value": "New"}) == (
+        {"$set": {"content.title": "New"}},
+        {"content.title": {"$exists": True}},
+    )
+
+
+def test_replace_array_element_is_guarded_by_stored_value():
+    assert compiled({"list": ["a", {"b": 1}]}, {"op": "replace", "path": "/list/1", "value": "c"}) == (
+        {"$set": {"content.list.1": "c"}},
+        {"content.list.1": {"b": 1}},
+    )
+
+
+def test_replace_inside_array_element_pins_the_element():
+    assert compiled({"a": [{"x": 1}]}, {"op": "replace", "path": "/a/0/x", "value": 2}) == (
+        {"$set": {"content.a.0.x": 2}},
+        {"content.a.0": {"x": 1}, "content.a.0.x": {"$exists": True}},
+    )
+
+
+def test_replace_in_nested_arrays_pins_every_element_on_the_path():
+    assert compiled({"a": [{"b": ["p", "q"]}]}, {"op": "replace", "path": "/a/0/b/1", "value": "r"}) == (
+        {"$set": {"content.a.0.b.1": "r"}},
+        {"content.a.0": {"b": ["p", "q"]}, "content.a.0.b.1": "q"},
+    )
+
+
+def test_add_member_inside_array_element_pins_the_element():
+    assert compiled({"a": [{"x": 1}]}, {"op": "add", "path": "/a/0/y", "value": 2}) == (
+        {"$set": {"content.a.0.y": 2}},
+        {"content.a.0": {"x": 1}},
+    )
+
+
+def test_remove_member_inside_array_element_pins_the_element():
+    assert compiled({"a": [{"x": 1, "y": 2}]}, {"op": "remove", "path": "/a/0/y"}) == (
+        {"$unset": {"content.a.0.y": ""}},
+        {"content.a.0": {"x": 1, "y": 2}, "content.a.0.y": {"$exists": True}},
+    )
+
+
+def test_sibling_edits_inside_one_element_pin_its_stored_value():
+    assert compiled(
+        {"a": [{"x": 1, "y": 1}]},
+        {"op": "replace", "path": "/a/0/x", "value": 2},
+        {"op": "replace", "path": "/a/0/y", "value": 3},
+    ) == (
+        {"$set": {"content.a.0.x": 2, "content.a.0.y": 3}},
+        {"content.a.0": {"x": 1, "y": 1}, "content.a.0.x": {"$exists": True}, "content.a.0.y": {"$exists": True}},
+    )
+
+
+def test_append_to_array_nested_in_array_pins_the_outer_element():
+    assert compiled({"a": [[1]]}, {"op": "add", "path": "/a/0/-", "value": 2}) == (
+        {"$push": {"content.a.0": {"$each": [2]}}},
+        {"content.a.0": [1]},
+    )
+
+
+def test_replace_whole_content():
+    assert compiled({"old": 1}, {"op": "replace", "path": "", "value": {"x": 1}}) == ({"$set": {"content": {"x": 1}}}, {})
+
+
+def test_move_between_members():
+    patch = apply_patch({"a": 1, "b": {}}, {"op": "move", "from": "/a", "path": "/b/a"})
+    assert patch.compile() == (
+        {"$set": {"content.b.a": 1}, "$unset": {"content.a": ""}},
+        {"content.a": {"$exists": True}, "content.b": {"$type": "object"}},
+    )
+    assert patch.content == {"b": {"a": 1}}
+
+
+def test_copy_guards_source_value():
+    assert compiled({"a": {"k": 1}}, {"op": "copy", "from": "/a", "path": "/b"}) == (
+        {"$set": {"content.b": {"k": 1}}},
+        {"content.a": {"k": 1}},
+    )
+
+
+def test_passing_test_only_adds_a_guard():
+    assert compiled({"a": 1}, {"op": "test", "path": "/a", "value": 1}) == ({}, {"content.a": 1})
+
+
+def test_original_content_is_not_modified():
+    content = {"list": [1, 2], "a": {"x": 1}}
+    apply_patch(content, {"op": "remove", "path": "/list/0"}, {"op": "add", "path": "/a/y", "value": 2})
+    assert content == {"list": [1, 2], "a": {"x": 1}}
+
+
+def test_overlapping_operations_rewrite_top_level_key():
+    assert compiled(
+        {"list": [1, 2], "other": 5},
+        {"op": "add", "path": "/list/-", "value": 3},
+        {"op": "remove", "path": "/list/0"},
+    ) == ({"$set": {"content.list": [2, 3]}}, {"content.list": [1, 2]})
+
+
+def test_overlapping_operations_unset_removed_key():
+    assert compiled(
+        {"a": {"x": 1}},
+        {"op": "add", "path": "/a/y", "value": 2},
+        {"op": "remove", "path": "/a"},
+    ) == ({"$unset": {"content.a": ""}}, {"content.a": {"x": 1}})
+
+
+def test_overlapping_operations_on_new_key_require_it_to_stay_absent():
+    assert compiled(
+        {},
+        {"op": "add", "path": "/a", "value": {}},
+        {"op": "add", "path": "/a/b", "value": 1},
+    ) == ({"$set": {"content.a": {"b": 1}}}, {"content.a": {"$exists": False}})
+
+
+def test_overlap_with_whole_content_replace_guards_entire_content():
+    assert compiled(
+        {"old": 1},
+        {"op": "replace", "path": "", "value": {"x": 1}},
+        {"op": "add", "path": "/y", "value": 2},
+    ) == ({"$set": {"content": {"x": 1, "y": 2}}}, {"content": {"old": 1}})
+
+
+def test_failed_test_operation_conflicts():
+    assert_rejected(409, {"a": 1}, {"op": "test", "path": "/a", "value": 2})
+
+
+@pytest.mark.parametrize("content, operation", [
+    ({"a": 1}, {"op": "replace", "path": "/missing", "value": 1}),
+    ({"a": 1}, {"op": "remove", "path": "/missing"}),
+    ({"a": 1}, {"op": "add", "path": "a", "value": 1}),
+    ({"a": 1}, {"op": "add", "path": "/a.b", "value": 1}),
+    ({"a": 1}, {"op": "add", "path": "/$where", "value": 1}),
+    ({"a": 1}, {"op": "add", "path": "/b"}),
+    ({"a": 1}, {"op": "replace", "path": "/a"}),
+    ({"a": {"b": 1}}, {"op": "move", "from": "/a", "path": "/a/b/c"}),
+    ({"a": 1}, {"op": "move", "path": "/b"}),
+    ({"a": 1}, {"op": "remove", "path": ""}),
+    ({"a": 1}, {"op": "replace", "path": "", "value": [1]}),
+    ({"list": [1]}, {"op": "add", "path": "/list/5", "value": 1}),
+    ({"list": [1, 2]}, {"op": "remove", "path": "/list/01"}),
+    ({"a": 1}, {"op": "add", "path": "/a/b", "value": 1}),
+])
+def test_invalid_operations_are_rejected(content, operation):
+    assert_rejected(400, content, operation)
@@ -0,0 +1,164 @@
+from datetime import datetime
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import server
+
+NOW = datetime(2024, 5, 17, 9, 30, 15, 123456)
+EARLIER = datetime(2023, 11, 2, 18, 4, 0)
+
+PAGE = {
+    "id": "0f6c5a52-1b7e-4f55-9d0e-5b2a4b8f7d10",
+    "page_name": "home",
+    "title": "Welcome to Odon Lab",
+    "subtitle": "Virology and immunology research",
+    "content": {
+        "hero_title": "Advancing virology",
+        "research_interests": ["Virus-host interactions", "Innate immunity"],
+        "stats": {"publications": 42, "impact": 7.5, "active": True, "lead": None},
+        "reviewed_at": EARLIER,
+    },
+    "meta_description": "Research lab",
+    "meta_keywords": "virology, immunology",
+    "is_published": True,
+    "version": 3,
+    "created_at": EARLIER,
+    "updated_at": NOW,
+}
+
+PROJECT = {
+    "id": "7d1e2c3b-9a8f-4e6d-b5c4-3a2b1c0d9e8f",
+    "title": "Viral Pathogenesis Studies",
+    "description": "Investigating viral infection mechanisms.",
+    "key_areas": "Viral entry, replication, immune evasion",
+    "icon": "🧬",
+    "order": 1,
+    "is_published": False,
+    "version": 1,
+    "created_at": EARLIER,
+    "updated_at": NOW,
+}
+
+MEDIA = {
+    "id": "2b3c4d5e-6f70-4812-9a3b-4c5d6e7f8091",
+    "filename": "2b3c_lab.png",
+    "original_filename": "lab.png",
+    "file_type": "image/png",
+    "file_size": 482113,
+    "storage_id": "c1d2e3f4-a5b6-4c7d-8e9f-0a1b2c3d4e5f",
+    "content_hash": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+    "derivatives": {
+        "thumbnail": {
+            "storage_id": "d2e3f4a5-b6c7-4d8e-9f0a-1b2c3d4e5f60",
+            "file_type": "image/png",
+            "file_size": 18211,
+            "width": 200,
+            "height": 150,
+            "content_hash": "3a7bd3e2360a3d29eea436fcfb7e44c735d117c42d1c1835420b6b9942dd4f1b",
+            "created_at": NOW,
+        },
+        "thumbnail.webp": {
+            "storage_id": "e3f4a5b6-c7d8-4e9f-0a1b-2c3d4e5f6071",
+            "file_type": "image/webp",
+            "file_size": 6034,
+            "width": 200,
+            "height": 150,
+            "content_hash": "b5bb9d8014a0f9b1d61e21e796d78dccdf1352f23cd32812f4850b878ae4944c",
+            "created_at": NOW,
+        },
+    },
+    "uploaded_at": NOW,
+}
+
+SETTINGS = {
+    "id": "4c5d6e7f-8091-42a3-b4c5-d6e7f8091a2b",
+    "site_name": "Odon Lab",
+    "site_description": "Virology Research Lab",
+    "contact_email": "lab@example.com",
+    "contact_phone": "+44 (0)141 548 2000",
+    "address": "161 Cathedral Street, Glasgow",
+    "logo_url": None,
+    "hero_image_url": "https://example.com/hero.jpg",
+    "theme_colors": {"primary": "#3b82f6", "secondary": "#8b5cf6"},
+    "social_links": {},
+    "version": 5,
+    "updated_at": NOW,
+}
+
+JOB = {
+    "id": "5d6e7f80-91a2-43b4-c5d6-e7f8091a2b3c",
+    "type": "media.derivatives",
+    "payload": {"content_hash": MEDIA["content_hash"]},
+    "status": "succeeded",
+    "attempts": 2,
+    "max_attempts": 5,
+    "dedupe_key": "media.derivatives:" + MEDIA["content_hash"],
+    "run_at": EARLIER,
+    "lease_expires_at": None,
+    "last_error": "OSError: connection reset",
+    "result": {"rendered": 6},
+    "created_at": EARLIER,
+    "updated_at": NOW,
+    "finished_at": NOW,
+}
+
+
+def without(document: dict, *fields: str):
+    return {key: value for key, value in document.items() if key not in fields}
+
+
+CASES = [
+    pytest.param(server.PageContent, PAGE, id="page"),
+    pytest.param(server.PageContent, without(PAGE, "subtitle", "meta_description", "meta_keywords"), id="page-missing-optional"),
+    pytest.param(server.PageContent, without(PAGE, "version", "is_published"), id="page-legacy-without-version"),
+    pytest.param(
+        server.PageContent,
+        {**PAGE, "title": "Forschung in Zürich — 研究室", "content": {"quote": "«Vírus» ✓ 🧬", "emoji": "🔬"}},
+        id="page-non-ascii",
+    ),
+    pytest.param(server.PageContent, {**PAGE, "content": {}}, id="page-empty-content"),
+    pytest.param(
+        server.PageContent,
+        {**PAGE, "content": {"n": 1e-7, "m": -2.5e-5, "big": 1e16, "huge": 1.5e300, "tiny": [5e-324, 0.0001]}},
+        id="page-float-exponents",
+    ),
+    pytest.param(server.PageContent, {**PAGE, "content": {"formula": "k = 1e-7 at 0.00001 M"}}, id="page-exponent-in-string"),
+    pytest.param(server.Project, PROJECT, id="project"),
+    pytest.param(server.Project, without(PROJECT, "version", "is_published", "order"), id="project-legacy-defaults"),
+    pytest.param(server.Project, {**PROJECT, "order": 2.0}, id="project-float-order"),
+    pytest.param(server.Project, {**PROJECT, "version": 4.0}, id="project-float-version"),
+    pytest.param(server.MediaFile, MEDIA, id="media-with-derivatives"),
+    pytest.param(server.MediaFile, without(MEDIA, "derivatives", "content_hash"), id="media-legacy"),
+    pytest.param(
+        server.MediaFile,
+        {**MEDIA, "derivatives": {"thumbnail": {**MEDIA["derivatives"]["thumbnail"], "width": 200.0}}},
+        id="media-float-derivative-width",
+    ),
+    pytest.param(server.SiteSettings, SETTINGS, id="settings"),
+    pytest.param(server.SiteSettings, without(SETTINGS, "logo_url", "hero_image_url", "version"), id="settings-legacy"),
+    pytest.param(server.Job, JOB, id="job"),
+    pytest.param(server.Job, without(JOB, "dedupe_key", "lease_expires_at", "last_error", "result", "finished_at"), id="job-missing-optional"),
+    pytest.param(server.Job, {**JOB, "attempts": 1.0}, id="job-float-attempts"),
+    pytest.param(server.Job, {**JOB, "result": {"loss": 3.2e-6}}, id="job-float-exponent-result"),
+    pytest.param(server.PageContent, {**PAGE, "_id": "legacy-object-id"}, id="page-extra-field"),
+]
+
+
+@pytest.mark.parametrize("model_class, document", CASES)
+def test_trusted_dump_matches_validated_model(model_class, document):
+    expected = JSONResponse(jsonable_encoder(model_class(**document))).body
+    assert server.TrustedJSONResponse(server.trusted_dump(model_class, document)).body == expected
+
+
+@pytest.mark.parametrize("model_class, document", CASES)
+def test_to_models_matches_validated_models(model_class, document, monkeypatch):
+    monkeypatch.setattr(server, "FAST_RESPONSES", True)
+    expected = JSONResponse(jsonable_encoder([model_class(**document)])).body
+    assert server.TrustedJSONResponse(server.to_models(model_class, [document])).body == expected
+
+
+def test_trusted_dump_keeps_field_order_and_drops_unknown_keys():
+    dumped = server.trusted_dump(server.Project, {**PROJECT, "_id": "x", "legacy": 1})
+    assert list(dumped) == list(server.Project.model_fields)
@@ -0,0 +1,17 @@
+import server
+
+
+def snippet(body: str, *terms: str):
+    return server.search_snippet({"body": body, "subtitle": "", "title": ""}, list(terms))
+
+
+def test_snippet_escapes_text_and_marks_terms():
+    assert snippet("Viral <b>entry</b> & replication", "entry") == "Viral &lt;b&gt;<mark>entry</mark>&lt;/b&gt; &amp; replication"
+
+
+def test_snippet_never_marks_inside_escaped_entities():
+    assert snippet("R&D <quote>", "amp", "quot") == "R&amp;D &lt;<mark>quot</mark>e&gt;"
+
+
+def test_snippet_marks_terms_containing_special_characters():
+    assert snippet("R&D lab", "r&d") == "<mark>R&amp;D</mark> lab"